@@ -0,0 +1,457 @@
+"""
+Audio Front-End Module
+Vectorized voice-activity detection, silence trimming, gain normalization
+and resampling for captured microphone audio
+"""
+
+import math
+import time
+from config import (
+    AUDIO_TARGET_RATE,
+    VAD_FRAME_MS,
+    VAD_ONSET_MS,
+    VAD_HANGOVER_MS,
+    VAD_PREROLL_MS,
+    VAD_TRIM_PAD_MS,
+    VAD_NOISE_RATIO,
+    GAIN_TARGET_DBFS,
+    GAIN_MAX_DB,
+    BARGE_IN_ONSET_MS,
+    BARGE_IN_WARMUP_MS,
+    BARGE_IN_ECHO_RATIO,
+    BARGE_IN_ECHO_DECAY_MS,
+    PARTIAL_INTERVAL_MS,
+    PARTIAL_PAUSE_MS,
+)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+class ListenTimeout(Exception):
+    """Raised when no speech starts before the capture timeout"""
+
+def as_samples(buffer):
+    """View a 16-bit PCM buffer as an int16 array without copying"""
+    return np.frombuffer(buffer, dtype=np.int16)
+
+def frame_view(samples, frame_len):
+    """View samples as (n_frames, frame_len), dropping any partial last frame"""
+    n_frames = len(samples) // frame_len
+    return samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+
+def frame_rms(samples, frame_len):
+    """Root-mean-square energy of each frame (same scale as audioop.rms)"""
+    frames = frame_view(samples, frame_len).astype(np.float32)
+    if not len(frames):
+        return np.zeros(0, dtype=np.float32)
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame_len)
+
+def voiced_mask(rms, threshold, hangover_frames=0):
+    """Mark frames above threshold as voiced, holding each for hangover_frames after it"""
+    voiced = rms > threshold
+    if hangover_frames <= 0 or not voiced.any():
+        return voiced
+
+    # Distance from each frame back to the most recent voiced frame
+    idx = np.arange(len(rms))
+    last_voiced = np.maximum.accumulate(np.where(voiced, idx, -hangover_frames - 1))
+    return (idx - last_voiced) <= hangover_frames
+
+def trim_silence(samples, rate, threshold, frame_ms=VAD_FRAME_MS, pad_ms=VAD_TRIM_PAD_MS):
+    """Return a view of samples with leading and trailing silence removed"""
+    frame_len = max(1, int(rate * frame_ms / 1000))
+    voiced = np.flatnonzero(frame_rms(samples, frame_len) > threshold)
+    if not len(voiced):
+        return samples[:0]
+
+    pad = int(rate * pad_ms / 1000)
+    start = max(0, voiced[0] * frame_len - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame_len + pad)
+    return samples[start:end]
+
+def normalize_gain(samples, target_dbfs=GAIN_TARGET_DBFS, max_gain_db=GAIN_MAX_DB):
+    """Scale samples so the peak sits at target_dbfs, boosting by at most max_gain_db"""
+    if not len(samples):
+        return samples
+    peak = int(np.max(np.abs(samples.astype(np.int32))))
+    if peak == 0:
+        return samples
+
+    target = 32767 * 10 ** (target_dbfs / 20)
+    gain = min(target / peak, 10 ** (max_gain_db / 20))
+    if abs(gain - 1.0) < 0.01:
+        return samples
+    scaled = samples.astype(np.float32) * gain
+    return np.clip(scaled, -32768, 32767).astype(np.int16)
+
+def resample(samples, src_rate, dst_rate):
+    """Resample int16 samples with a box low-pass and linear interpolation"""
+    if src_rate == dst_rate or not len(samples):
+        return samples
+
+    data = samples.astype(np.float32)
+    if dst_rate < src_rate:
+        # Crude anti-aliasing: average over the decimation span
+        width = int(round(src_rate / dst_rate))
+        if width > 1:
+            data = np.convolve(data, np.ones(width, dtype=np.float32) / width, mode="same")
+
+    n_out = int(len(data) * dst_rate / src_rate)
+    positions = np.arange(n_out, dtype=np.float64) * (src_rate / dst_rate)
+    out = np.interp(positions, np.arange(len(data)), data)
+    return np.clip(np.round(out), -32768, 32767).astype(np.int16)
+
+class AudioFrontEnd:
+    def __init__(self, target_rate=AUDIO_TARGET_RATE, frame_ms=VAD_FRAME_MS,
+                 onset_ms=VAD_ONSET_MS, hangover_ms=VAD_HANGOVER_MS, preroll_ms=VAD_PREROLL_MS):
+        """Initialize the front-end with VAD timing and output rate"""
+        self.target_rate = target_rate
+        self.frame_ms = frame_ms
+        self.onset_ms = onset_ms
+        self.hangover_ms = hangover_ms
+        self.preroll_ms = preroll_ms
+
+    def capture(self, source, energy_threshold, timeout=None, phrase_time_limit=None,
+                playback_active=None, on_barge_in=None, on_partial=None):
+        """Read from an open microphone until the utterance ends.
+
+        While playback_active() is true the mic also hears our own speech, so
+        onsets must rise above a tracked echo level; on_barge_in(onset_time)
+        is called when the user starts talking over playback. If on_partial
+        is given it receives (pcm_bytes, sample_rate, sample_width, paused)
+        for the utterance so far every PARTIAL_INTERVAL_MS while the user
+        speaks, and once with paused=True when they stop for PARTIAL_PAUSE_MS.
+
+        Returns (pcm_bytes, sample_rate, sample_width) after trimming,
+        gain normalization and resampling to target_rate.
+        """
+        rate = source.SAMPLE_RATE
+        width = source.SAMPLE_WIDTH
+        chunk = source.CHUNK
+        if width != 2:
+            raise ValueError(f"Unsupported sample width: {width}")
+
+        frame_len = max(1, int(rate * self.frame_ms / 1000))
+        onset_frames = max(1, self.onset_ms // self.frame_ms)
+        barge_in_frames = max(onset_frames, BARGE_IN_ONSET_MS // self.frame_ms)
+        warmup_frames = BARGE_IN_WARMUP_MS // self.frame_ms
+        hangover_frames = max(1, self.hangover_ms // self.frame_ms)
+        preroll = int(rate * self.preroll_ms / 1000)
+        partial_step = int(rate * PARTIAL_INTERVAL_MS / 1000)
+        pause_frames = max(1, PARTIAL_PAUSE_MS // self.frame_ms)
+        next_partial = None
+        pause_reported = False
+
+        # One preallocated capture buffer; frames are read as views over it
+        limit = phrase_time_limit or 30
+        capacity = int(rate * (limit + self.preroll_ms / 1000 + 1)) * width
+        buffer = bytearray(capacity + chunk * width)
+        samples = as_samples(buffer)
+
+        write_pos = 0  # in samples
+        scan_pos = 0  # first sample not yet classified
+        speech_start = None
+        voiced_run = 0
+        silent_run = 0
+        noise = float(energy_threshold) / VAD_NOISE_RATIO
+        threshold = float(energy_threshold)
+        echo = None  # peak envelope of our own voice at the mic during playback
+        echo_decay = math.exp(-self.frame_ms / BARGE_IN_ECHO_DECAY_MS)
+        playback_frames = 0
+        started = time.monotonic()
+
+        while True:
+            data = source.stream.read(chunk)
+            if not data:
+                break
+            n = len(data) // width
+            if write_pos + n > len(samples):
+                break
+            buffer[write_pos * width:(write_pos + n) * width] = data
+            write_pos += n
+
+            playing = speech_start is None and playback_active is not None and playback_active()
+            if not playing:
+                echo = None
+                playback_frames = 0
+
+            n_new = (write_pos - scan_pos) // frame_len
+            if n_new:
+                rms = frame_rms(samples[scan_pos:scan_pos + n_new * frame_len], frame_len)
+                # A read holds about one frame, so the endpointing state machine
+                # stays scalar; benchmark() measures its cost per audio second
+                for energy in rms:
+                    energy = float(energy)
+                    level = threshold
+                    needed = onset_frames
+                    if playing:
+                        playback_frames += 1
+                        echo = energy if echo is None else echo * echo_decay
+                        level = max(threshold, echo * BARGE_IN_ECHO_RATIO)
+                        needed = barge_in_frames
+
+                    warming_up = playing and playback_frames <= warmup_frames
+                    if energy > level and not warming_up:
+                        voiced_run += 1
+                        silent_run = 0
+                    else:
+                        if playing:
+                            # Learn how loud our own voice is at the mic. The envelope
+                            # holds peaks and decays slowly, so gaps between words do
+                            # not pull it down and louder syllables stay below level.
+                            echo = max(echo, energy)
+                        elif speech_start is None:
+                            # Track the noise floor while waiting for speech
+                            noise = 0.9 * noise + 0.1 * energy
+                            threshold = max(float(energy_threshold), noise * VAD_NOISE_RATIO)
+                        voiced_run = 0
+                        silent_run += 1
+
+                    scan_pos += frame_len
+                    if speech_start is None and voiced_run >= needed:
+                        onset = scan_pos - voiced_run * frame_len
+                        speech_start = max(0, onset - preroll)
+                        next_partial = scan_pos + partial_step
+                        if playing and on_barge_in:
+                            on_barge_in(time.monotonic() - (write_pos - onset) / rate)
+                    elif speech_start is not None and silent_run >= hangover_frames:
+                        return self.finish(samples[speech_start:scan_pos], rate, threshold)
+
+            if speech_start is None:
+                if playing:
+                    # The user may wait for us to finish talking; start the clock afterwards
+                    started = time.monotonic()
+                elif timeout and time.monotonic() - started > timeout:
+                    raise ListenTimeout()
+                # Keep only the pre-roll while waiting, so the buffer never fills up
+                if write_pos > len(samples) // 2:
+                    drop = scan_pos - min(preroll + frame_len, scan_pos)
+                    tail = write_pos - drop
+                    buffer[:tail * width] = buffer[drop * width:write_pos * width]
+                    write_pos = tail
+                    scan_pos -= drop
+            elif phrase_time_limit and (write_pos - speech_start) / rate >= phrase_time_limit:
+                break
+            elif on_partial:
+                if not silent_run:
+                    pause_reported = False
+                paused = silent_run >= pause_frames
+                if scan_pos >= next_partial or (paused and not pause_reported):
+                    # A pause usually means the words so far are complete
+                    pause_reported = pause_reported or paused
+                    next_partial = scan_pos + partial_step
+                    on_partial(*self.finish(samples[speech_start:scan_pos], rate, threshold), paused)
+
+        if speech_start is None:
+            raise ListenTimeout()
+        return self.finish(samples[speech_start:write_pos], rate, threshold)
+
+    def finish(self, samples, rate, threshold):
+        """Trim, normalize and resample a captured utterance"""
+        trimmed = trim_silence(samples, rate, threshold, self.frame_ms)
+        if not len(trimmed):
+            trimmed = samples
+        out = resample(normalize_gain(trimmed), rate, self.target_rate or rate)
+        return out.tobytes(), self.target_rate or rate, 2
+
+def _python_rms(chunk):
+    """Per-sample pure-Python RMS of a 16-bit chunk (reference for benchmarks)"""
+    values = memoryview(chunk).cast("h")
+    total = 0
+    for v in values:
+        total += v * v
+    return int((total / len(values)) ** 0.5) if len(values) else 0
+
+class _PCMStream:
+    def __init__(self, pcm):
+        """Stream over in-memory PCM that counts how much has been read"""
+        self.pcm = pcm
+        self.pos = 0
+
+    def read(self, frames):
+        data = self.pcm[self.pos:self.pos + frames * 2]
+        self.pos += len(data)
+        return data
+
+def _bench_source(pcm, rate, chunk, base=object):
+    """Microphone stand-in that plays back pcm; base lets it pass as an sr.AudioSource"""
+    class BenchSource(base):
+        def __init__(self):
+            self.SAMPLE_RATE = rate
+            self.SAMPLE_WIDTH = 2
+            self.CHUNK = chunk
+            self.stream = _PCMStream(pcm)
+    return BenchSource()
+
+def _chunk_endpoint(source, chunk_rms, threshold, pause_threshold=0.8):
+    """Replay Recognizer.listen's per-chunk endpointing when speech_recognition is missing"""
+    seconds_per_buffer = source.CHUNK / source.SAMPLE_RATE
+    pause_buffers = int(math.ceil(pause_threshold / seconds_per_buffer))
+    while True:
+        data = source.stream.read(source.CHUNK)
+        if not data or chunk_rms(data) > threshold:
+            break
+    pause_count = 0
+    while True:
+        data = source.stream.read(source.CHUNK)
+        if not data:
+            break
+        pause_count = 0 if chunk_rms(data) > threshold else pause_count + 1
+        if pause_count > pause_buffers:
+            break
+
+def benchmark(seconds=10, rate=44100, chunk=1024, repeats=3):
+    """Compare the per-chunk energy path with the vectorized front-end on synthetic audio"""
+    if not NUMPY_AVAILABLE:
+        print("NumPy is not installed")
+        return {}
+
+    try:
+        import audioop
+        chunk_rms = lambda data: audioop.rms(data, 2)
+        reference = "audioop.rms"
+    except ImportError:
+        chunk_rms = _python_rms
+        reference = "pure Python rms"
+
+    # 1s noise, speech-like bursts, then trailing noise
+    rng = np.random.default_rng(0)
+    total = int(seconds * rate)
+    signal = rng.normal(0, 60, total)
+    t = np.arange(int(rate * 2)) / rate
+    speech = 4000 * np.sin(2 * np.pi * 220 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    signal[rate:rate + len(speech)] += speech
+    pcm = np.clip(signal, -32768, 32767).astype(np.int16).tobytes()
+    threshold = 300
+
+    def per_chunk():
+        step = chunk * 2
+        return [chunk_rms(pcm[i:i + step]) > threshold for i in range(0, len(pcm), step)]
+
+    frame_len = int(rate * VAD_FRAME_MS / 1000)
+
+    def vectorized():
+        return voiced_mask(frame_rms(as_samples(pcm), frame_len), threshold)
+
+    def best(fn):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    # Endpointing: play the same audio into both capture paths and measure
+    # how much audio each reads past the end of speech before returning
+    speech_end = (rate + len(speech)) * 2
+    try:
+        import speech_recognition as sr
+        recognizer = sr.Recognizer()
+        recognizer.energy_threshold = threshold
+        recognizer.dynamic_energy_threshold = False
+        current = _bench_source(pcm, rate, chunk, sr.AudioSource)
+        recognizer.listen(current)
+        current_path = "Recognizer.listen"
+    except ImportError:
+        current = _bench_source(pcm, rate, chunk)
+        _chunk_endpoint(current, chunk_rms, threshold)
+        current_path = "Recognizer.listen replay"
+
+    frontend = AudioFrontEnd()
+    source = _bench_source(pcm, rate, chunk)
+    start = time.perf_counter()
+    out, out_rate, _ = frontend.capture(source, threshold)
+    capture_seconds = time.perf_counter() - start
+
+    results = {
+        "reference": reference,
+        "audio_seconds": seconds,
+        "per_chunk_ms": best(per_chunk) * 1000,
+        "vectorized_ms": best(vectorized) * 1000,
+        "endpoint_path_current": current_path,
+        "endpoint_delay_current_ms": (current.stream.pos - speech_end) / 2 / rate * 1000,
+        "endpoint_delay_frontend_ms": (source.stream.pos - speech_end) / 2 / rate * 1000,
+        "capture_ms_per_audio_second": capture_seconds * 1000 / (source.stream.pos / 2 / rate),
+        "bytes_read_current": current.stream.pos,
+        "upload_bytes_frontend": len(out),
+        "output_rate": out_rate,
+    }
+
+    for key, value in results.items():
+        if isinstance(value, float):
+            print(f"{key}: {value:.2f}")
+        else:
+            print(f"{key}: {value}")
+    return results
+
+def _echo_signal(rng, rate, seconds=4.0, lead_in=0.0, base=400):
+    """TTS-like echo: 350ms words with 150-250ms gaps, word levels varying up to 3x"""
+    parts = [rng.normal(0, 40, int(rate * lead_in))]
+    length = 0
+    while length < rate * seconds:
+        n = int(rate * 0.35)
+        t = np.arange(n) / rate
+        amp = base * rng.uniform(1, 3)
+        parts.append(amp * np.sin(2 * np.pi * 180 * t) * np.hanning(n) ** 0.3 + rng.normal(0, 40, n))
+        parts.append(rng.normal(0, 40, int(rate * rng.uniform(0.15, 0.25))))
+        length = sum(len(p) for p in parts)
+    return np.concatenate(parts)
+
+def check_barge_in(runs=50, rate=16000, chunk=512, user_amplitude=6000, user_at=2.0):
+    """Play simulated echo through capture(): echo alone must never barge in, echo plus user must"""
+    if not NUMPY_AVAILABLE:
+        print("NumPy is not installed")
+        return {}
+
+    frontend = AudioFrontEnd(target_rate=None)
+
+    def play(signal, echo_end):
+        pcm = np.clip(signal, -32768, 32767).astype(np.int16).tobytes()
+        source = _bench_source(pcm, rate, chunk)
+        onsets = []
+        try:
+            frontend.capture(source, 300, timeout=1,
+                             playback_active=lambda: source.stream.pos < echo_end * 2,
+                             on_barge_in=lambda t: onsets.append(source.stream.pos / 2 / rate))
+        except ListenTimeout:
+            pass
+        return onsets
+
+    false_barge_ins = 0
+    missed = 0
+    delays = []
+    for seed in range(runs):
+        rng = np.random.default_rng(seed)
+        echo = _echo_signal(rng, rate, lead_in=0.3 if seed % 2 else 0.0)
+        tail = rng.normal(0, 40, rate)
+        if play(np.concatenate([echo, tail]), len(echo)):
+            false_barge_ins += 1
+
+        mixed = np.concatenate([echo, tail])
+        start, n = int(rate * user_at), int(rate * 1.5)
+        ramp = np.minimum(1.0, np.arange(n) / (0.06 * rate))
+        mixed[start:start + n] += user_amplitude * ramp * np.sin(2 * np.pi * 250 * np.arange(n) / rate)
+        onsets = play(mixed, len(echo))
+        if onsets:
+            delays.append((onsets[0] - user_at) * 1000)
+        else:
+            missed += 1
+
+    results = {
+        "runs": runs,
+        "false_barge_ins": false_barge_ins,
+        "missed_barge_ins": missed,
+        "detect_ms_mean": sum(delays) / len(delays) if delays else 0.0,
+    }
+    for key, value in results.items():
+        print(f"{key}: {value:.1f}" if isinstance(value, float) else f"{key}: {value}")
+    return results
+
+if __name__ == "__main__":
+    import sys
+    benchmark()
+    sys.exit(1 if check_barge_in().get("false_barge_ins") else 0)
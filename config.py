@@ -12,14 +12,66 @@ APP_VERSION = "1.0.0"
 HISTORY_FILE = "kiddo_history.txt"
 MAX_HISTORY_ENTRIES = 5
 
+# Error Log Settings
+ERROR_LOG_FILE = "kiddo_errors.log"
+ERROR_LOG_MAX_BYTES = 1024 * 1024  # rotate after 1MB
+ERROR_LOG_BACKUP_COUNT = 3  # rotated files to keep
+ERROR_LOG_ROTATE_SECONDS = 24 * 60 * 60  # rotate at least daily
+ERROR_LOG_QUEUE_SIZE = 10000  # records buffered before dropping
+ERROR_LOG_RATE_LIMIT_SECONDS = 10  # suppress identical errors within this window
+ERROR_LOG_RATE_LIMIT_KEYS = 4096  # distinct errors tracked for rate limiting; more are logged as-is
+
 # API Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-openai-api-key-here")
+LLM_REQUESTS_PER_MINUTE = 60  # client-side request rate limit
+LLM_TOKENS_PER_MINUTE = 30000  # client-side token rate limit
+LLM_MAX_CONCURRENCY = 4  # completions in flight at once
+LLM_REQUEST_TIMEOUT = 60  # seconds a caller waits for a scheduled completion
 
 # Speech Recognition Settings
 SPEECH_TIMEOUT = 10  # seconds
 PHRASE_TIME_LIMIT = 10  # seconds
 AMBIENT_NOISE_DURATION = 1  # seconds
 
+# Audio Front-End Settings (used when NumPy is installed)
+AUDIO_TARGET_RATE = 16000  # Hz sent to the recognizer
+VAD_FRAME_MS = 30  # analysis frame length
+VAD_ONSET_MS = 60  # voiced audio needed to start an utterance
+VAD_HANGOVER_MS = 500  # silence needed to end an utterance
+VAD_PREROLL_MS = 200  # audio kept from before the onset
+VAD_TRIM_PAD_MS = 100  # padding left around trimmed speech
+VAD_NOISE_RATIO = 1.5  # threshold over the tracked noise floor
+GAIN_TARGET_DBFS = -3.0  # peak level after normalization
+GAIN_MAX_DB = 20.0  # largest boost applied to quiet speech
+
+# Barge-in Settings (interrupting KiddoBot while it speaks)
+BARGE_IN_ENABLED = True
+BARGE_IN_ONSET_MS = 150  # voiced audio over our own echo needed to interrupt
+BARGE_IN_WARMUP_MS = 300  # time to learn the echo level when playback starts
+BARGE_IN_ECHO_RATIO = 2.0  # user speech must be this much louder than the echo
+BARGE_IN_ECHO_DECAY_MS = 2000  # how slowly the learned echo peak fades during playback
+
+# Streaming Recognition Settings
+STREAMING_PARTIALS = True  # recognize partial audio while the user is still talking
+PARTIAL_INTERVAL_MS = 600  # how often a partial hypothesis is requested
+PARTIAL_PAUSE_MS = 200  # a pause this long triggers a partial treated as stable
+LLM_WARMUP_INTERVAL = 30  # seconds between speculative OpenAI connection warm-ups
+
+# Profiling Settings (main.py --profile)
+PROFILE_INTERVAL_MS = 10  # time between stack samples
+PROFILE_TOP_N = 20  # hotspots listed in the summary
+
+# Diagnostics Settings (main.py --diagnose)
+DIAGNOSE_TIMEOUT = 10  # seconds allowed for each check
+
+# File Transcription Settings
+FILE_SILENCE_THRESHOLD = 300  # minimum energy counted as speech
+FILE_MIN_SILENCE_MS = 400  # pause length that splits utterances
+FILE_MIN_CHUNK_MS = 150  # voiced audio needed to keep a chunk
+FILE_MAX_CHUNK_SECONDS = 30  # force a split in long unbroken speech
+FILE_CHUNK_PAD_MS = 200  # context kept around each chunk
+TRANSCRIBE_WORKERS = None  # worker processes (None = one per CPU core)
+
 # Text-to-Speech Settings
 TTS_RATE = 200  # words per minute
 TTS_VOLUME = 0.9  # 0.0 to 1.0
@@ -41,6 +93,11 @@ JOKE_COMMANDS = ["joke", "funny", "laugh", "humor"]
 WEBSITE_COMMANDS = ["open", "youtube", "google", "website"]
 EXIT_COMMANDS = ["stop", "quit", "bye", "goodbye", "exit"]
 
+# Local Intent Classifier Settings (used when NumPy is installed)
+INTENT_FEATURES = 4096  # hashed feature dimensions
+INTENT_THRESHOLD = 0.5  # minimum cosine similarity to answer locally
+INTENT_MARGIN = 0.15  # lead over the closest "other" example needed to answer locally
+
 def get_config():
     """Get application configuration as dictionary"""
     return {
@@ -0,0 +1,155 @@
+"""
+Diagnostics Module
+Runs environment checks and backend latency probes concurrently and
+produces a machine-readable timing report
+"""
+
+import datetime
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+from config import APP_NAME, APP_VERSION, DIAGNOSE_TIMEOUT
+from utils import validate_environment, get_system_info
+
+class SkipCheck(Exception):
+    """Raised by a check whose prerequisites are missing"""
+
+def check_environment():
+    """Required modules present (find_spec, no import) and API key set"""
+    issues = validate_environment()
+    if issues:
+        raise RuntimeError("; ".join(issues))
+    return "All required modules found"
+
+def check_microphone():
+    """Open the default microphone and read one chunk"""
+    import speech_recognition as sr
+    with sr.Microphone() as source:
+        data = source.stream.read(source.CHUNK)
+        return f"Read {len(data)} bytes at {source.SAMPLE_RATE} Hz"
+
+def check_recognizer():
+    """Round trip to the Google recognizer with half a second of silence"""
+    import speech_recognition as sr
+    audio = sr.AudioData(b"\0\0" * 8000, 16000, 2)
+    try:
+        sr.Recognizer().recognize_google(audio)
+    except sr.UnknownValueError:
+        # Expected for silence: the service answered
+        pass
+    return "Recognizer responded"
+
+def check_openai():
+    """Fetch the model record to measure API latency without spending tokens"""
+    if not os.getenv("OPENAI_API_KEY"):
+        raise SkipCheck("OPENAI_API_KEY not set")
+    from openai import OpenAI
+    model = OpenAI(api_key=os.getenv("OPENAI_API_KEY")).models.retrieve("gpt-4o")
+    return f"Model {model.id} available"
+
+def check_wikipedia():
+    """Fetch a one-sentence summary"""
+    import wikipedia
+    summary = wikipedia.summary("Python (programming language)", sentences=1, auto_suggest=False)
+    return f"Received {len(summary)} characters"
+
+def check_tts():
+    """Initialize the TTS engine and synthesize a short phrase to a file (no playback)"""
+    import pyttsx3
+    engine = pyttsx3.init()
+    voices = engine.getProperty("voices") or []
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        engine.save_to_file("Testing audio output", path)
+        engine.runAndWait()
+        size = os.path.getsize(path)
+    finally:
+        os.remove(path)
+    return f"{len(voices)} voices, synthesized {size} bytes"
+
+CHECKS = {
+    "environment": check_environment,
+    "microphone": check_microphone,
+    "recognizer": check_recognizer,
+    "openai": check_openai,
+    "wikipedia": check_wikipedia,
+    "tts": check_tts,
+}
+
+def run_diagnostics(checks=None, timeout=DIAGNOSE_TIMEOUT):
+    """Run all checks at once, each bounded by timeout seconds, and return the report"""
+    checks = checks or CHECKS
+    results = {}
+    lock = threading.Lock()
+    threads = {}
+    started = time.perf_counter()
+
+    def run(name, fn):
+        start = time.perf_counter()
+        try:
+            detail = fn()
+            status = "ok"
+        except SkipCheck as e:
+            status, detail = "skipped", str(e)
+        except ImportError as e:
+            status, detail = "fail", f"Module not installed: {e.name or e}"
+        except Exception as e:
+            status, detail = "fail", f"{type(e).__name__}: {e}"
+        with lock:
+            # A check that finishes after its deadline keeps its timeout entry
+            results.setdefault(name, {
+                "name": name,
+                "status": status,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                "detail": detail,
+            })
+
+    # Daemon threads, so a hung device or socket cannot keep the process alive
+    deadlines = {}
+    for name, fn in checks.items():
+        threads[name] = threading.Thread(target=run, args=(name, fn), name=f"Diagnose-{name}", daemon=True)
+        deadlines[name] = time.perf_counter() + timeout
+        threads[name].start()
+
+    # Each check gets its own timeout, counted from when it started
+    for name, thread in threads.items():
+        thread.join(max(0.0, deadlines[name] - time.perf_counter()))
+        with lock:
+            results.setdefault(name, {
+                "name": name,
+                "status": "timeout",
+                "duration_ms": round(timeout * 1000, 1),
+                "detail": f"No result within {timeout}s",
+            })
+
+    with lock:
+        results = dict(results)
+    ordered = [results[name] for name in checks]
+    return {
+        "app": APP_NAME,
+        "version": APP_VERSION,
+        "host": platform.node(),
+        "timestamp": datetime.datetime.now().astimezone().isoformat(timespec="seconds"),
+        "system": get_system_info(),
+        "ok": all(r["status"] in ("ok", "skipped") for r in ordered),
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        "checks": ordered,
+    }
+
+def run_and_report(output=None, timeout=DIAGNOSE_TIMEOUT):
+    """Run diagnostics, print a summary, write JSON to output (or stdout) and return success"""
+    report = run_diagnostics(timeout=timeout)
+    text = json.dumps(report, indent=4)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        for check in report["checks"]:
+            print(f"{check['name']:12} {check['status']:8} {check['duration_ms']:9.1f} ms  {check['detail']}")
+        print(f"Report written to {output}")
+    else:
+        print(text)
+    return report["ok"]
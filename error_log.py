@@ -0,0 +1,298 @@
+"""
+Error Logging Module
+Queue-backed background writer for structured (JSON lines) error logs
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import datetime
+from collections import OrderedDict
+from config import (
+    ERROR_LOG_FILE,
+    ERROR_LOG_MAX_BYTES,
+    ERROR_LOG_BACKUP_COUNT,
+    ERROR_LOG_ROTATE_SECONDS,
+    ERROR_LOG_QUEUE_SIZE,
+    ERROR_LOG_RATE_LIMIT_SECONDS,
+    ERROR_LOG_RATE_LIMIT_KEYS,
+)
+
+class ErrorLogWriter:
+    def __init__(self, path=ERROR_LOG_FILE, max_bytes=ERROR_LOG_MAX_BYTES,
+                 backup_count=ERROR_LOG_BACKUP_COUNT, rotate_seconds=ERROR_LOG_ROTATE_SECONDS,
+                 queue_size=ERROR_LOG_QUEUE_SIZE, rate_limit_seconds=ERROR_LOG_RATE_LIMIT_SECONDS,
+                 rate_limit_keys=ERROR_LOG_RATE_LIMIT_KEYS):
+        """Initialize the writer; the background thread starts on first use"""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_seconds = rotate_seconds
+        self.rate_limit_seconds = rate_limit_seconds
+        self.rate_limit_keys = rate_limit_keys
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+        # Rate limiting state: (context, message) -> [window_start, suppressed_count],
+        # ordered by window start so expired windows are always at the front
+        self._recent = OrderedDict()
+        self._recent_lock = threading.Lock()
+
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._opened_at = 0.0
+
+    def start(self):
+        """Start the background writer thread if it is not running"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="ErrorLogWriter", daemon=True)
+            self._thread.start()
+
+    def log(self, message, context="", level="ERROR", **fields):
+        """Queue a log record without blocking; repeated errors are rate limited"""
+        now = time.time()
+        suppressed = self._check_rate_limit(context, message, now)
+        if suppressed is None:
+            return
+
+        record = {
+            "timestamp": datetime.datetime.fromtimestamp(now).isoformat(timespec="milliseconds"),
+            "level": level,
+            "context": context,
+            "message": str(message),
+            "thread": threading.current_thread().name,
+        }
+        if suppressed:
+            record["suppressed"] = suppressed
+        if fields:
+            record.update(fields)
+
+        self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block the caller; count what we had to throw away
+            self.dropped += 1
+
+    def _check_rate_limit(self, context, message, now):
+        """Return suppressed count to report, or None if this record should be dropped"""
+        if self.rate_limit_seconds <= 0:
+            return 0
+
+        key = (context, str(message))
+        with self._recent_lock:
+            entry = self._recent.get(key)
+            if entry and now - entry[0] < self.rate_limit_seconds:
+                entry[1] += 1
+                return None
+
+            if entry:
+                suppressed = entry[1]
+                entry[0], entry[1] = now, 0
+                self._recent.move_to_end(key)
+            elif len(self._recent) >= self.rate_limit_keys:
+                # Too many distinct messages to track: log this one without throttling
+                suppressed = 0
+            else:
+                suppressed = 0
+                self._recent[key] = [now, 0]
+
+            # Drop expired windows with nothing to report; stops at the first live one
+            cutoff = now - self.rate_limit_seconds
+            while self._recent:
+                oldest = next(iter(self._recent.values()))
+                if oldest[0] >= cutoff or oldest[1]:
+                    break
+                self._recent.popitem(last=False)
+            return suppressed
+
+    def _suppression_summaries(self, now, force=False):
+        """Summary records for rate-limit windows that have ended (all of them if force)"""
+        summaries = []
+
+        def summary(key, count):
+            context, message = key
+            return {
+                "timestamp": get_iso_timestamp(),
+                "level": "WARNING",
+                "context": context,
+                "message": message,
+                "suppressed": count,
+                "summary": True,
+            }
+
+        with self._recent_lock:
+            while self._recent:
+                key, entry = next(iter(self._recent.items()))
+                if now - entry[0] < self.rate_limit_seconds:
+                    break
+                self._recent.popitem(last=False)
+                if entry[1]:
+                    summaries.append(summary(key, entry[1]))
+            if force:
+                for key, entry in self._recent.items():
+                    if entry[1]:
+                        summaries.append(summary(key, entry[1]))
+                        entry[1] = 0
+        return summaries
+
+    def _notices(self, force=False):
+        """Records generated by the writer itself: dropped-record warning and suppression summaries"""
+        notices = []
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            notices.append({
+                "timestamp": get_iso_timestamp(),
+                "level": "WARNING",
+                "context": "error_log",
+                "message": f"Dropped {dropped} log records because the queue was full",
+            })
+        if self.rate_limit_seconds > 0:
+            notices += self._suppression_summaries(time.time(), force)
+        return notices
+
+    def _run(self):
+        """Drain the queue in batches and write them to disk"""
+        # Wake up once per rate-limit window so storm summaries land even if logging stops
+        wait = self.rate_limit_seconds if self.rate_limit_seconds > 0 else None
+        while True:
+            try:
+                record = self.queue.get(timeout=wait)
+            except queue.Empty:
+                notices = self._notices()
+                if notices:
+                    self._write_batch(notices)
+                continue
+            if record is None:
+                self.queue.task_done()
+                break
+
+            batch = [record]
+            stop = False
+            while len(batch) < 256:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+
+            # Only records taken off the queue count towards task_done()
+            self._write_batch(batch + self._notices())
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self.queue.task_done()
+            if stop:
+                break
+
+        notices = self._notices(force=True)
+        if notices:
+            self._write_batch(notices)
+        self._close_file()
+
+    def _write_batch(self, batch):
+        """Write a batch of records, rotating the file first if needed"""
+        try:
+            self._rotate_if_needed()
+            if self._file is None:
+                self._open_file()
+
+            lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch)
+            self._file.write(lines)
+            self._file.flush()
+        except Exception as e:
+            print(f"Failed to write error log: {e}")
+            self._close_file()
+
+    def _open_file(self):
+        """Open the log file for appending"""
+        self._file = open(self.path, "a", encoding="utf-8")
+        if os.path.getsize(self.path) == 0:
+            self._opened_at = time.time()
+        elif not self._opened_at:
+            self._opened_at = self._log_started()
+
+    def _log_started(self):
+        """When the current log file was started: its first record, else its creation time"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                first = json.loads(f.readline())
+            return datetime.datetime.fromisoformat(first["timestamp"]).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            # mtime is only a last resort: every append moves it forward
+            stat = os.stat(self.path)
+            return getattr(stat, "st_birthtime", stat.st_mtime)
+
+    def _close_file(self):
+        """Close the log file if it is open"""
+        if self._file:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+    def _rotate_if_needed(self):
+        """Rotate the log when it exceeds the size limit or the rotation interval"""
+        if not os.path.exists(self.path):
+            return
+
+        too_big = self.max_bytes > 0 and os.path.getsize(self.path) >= self.max_bytes
+        opened_at = self._opened_at or self._log_started()
+        too_old = self.rotate_seconds > 0 and time.time() - opened_at >= self.rotate_seconds
+        if not (too_big or too_old) or os.path.getsize(self.path) == 0:
+            return
+
+        self._close_file()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._opened_at = time.time()
+
+    def flush(self, timeout=2.0):
+        """Wait (up to timeout seconds) for queued records to reach disk"""
+        if not (self._thread and self._thread.is_alive()):
+            return
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+
+    def stop(self, timeout=2.0):
+        """Flush pending records and suppression counts, then stop the writer thread"""
+        if not (self._thread and self._thread.is_alive()):
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+def get_iso_timestamp():
+    """Get current timestamp in ISO 8601 format with milliseconds"""
+    return datetime.datetime.now().isoformat(timespec="milliseconds")
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_error_log():
+    """Get the shared error log writer"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = ErrorLogWriter()
+                atexit.register(_writer.stop)
+    return _writer
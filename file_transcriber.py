@@ -0,0 +1,249 @@
+"""
+File Transcription Module
+Splits long recordings at silence and transcribes the pieces in parallel
+"""
+
+import mmap
+import os
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from config import (
+    AUDIO_TARGET_RATE,
+    VAD_FRAME_MS,
+    VAD_NOISE_RATIO,
+    FILE_SILENCE_THRESHOLD,
+    FILE_MIN_SILENCE_MS,
+    FILE_MIN_CHUNK_MS,
+    FILE_MAX_CHUNK_SECONDS,
+    FILE_CHUNK_PAD_MS,
+    TRANSCRIBE_WORKERS,
+)
+from audio_frontend import NUMPY_AVAILABLE, frame_rms, resample
+from utils import log_error
+from llm_scheduler import PRIORITY_BATCH
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+try:
+    import soundfile
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    soundfile = None
+    SOUNDFILE_AVAILABLE = False
+
+class AudioFile:
+    def __init__(self, path):
+        """Open a recording for block-wise reading (WAV is memory-mapped)"""
+        self.path = path
+        self.kind = "flac" if path.lower().endswith(".flac") else "wav"
+        self._file = None
+        self._mmap = None
+        self._data = None
+
+        if self.kind == "wav":
+            self._open_wav()
+        else:
+            if not SOUNDFILE_AVAILABLE:
+                raise RuntimeError("FLAC input needs the 'soundfile' package (pip install soundfile)")
+            info = soundfile.info(path)
+            self.sample_rate = info.samplerate
+            self.channels = info.channels
+            self.frames = info.frames
+
+    def _open_wav(self):
+        """Parse the RIFF header and map the sample data without reading it"""
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mmap
+
+        if mm[:4] != b"RIFF" or mm[8:12] != b"WAVE":
+            raise ValueError(f"{self.path} is not a WAV file")
+
+        pos = 12
+        fmt = None
+        while pos + 8 <= len(mm):
+            chunk_id, size = struct.unpack("<4sI", mm[pos:pos + 8])
+            body = pos + 8
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", mm[body:body + 16])
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError("WAV data chunk found before fmt chunk")
+                audio_format, channels, rate, _, _, bits = fmt
+                if audio_format not in (1, 0xFFFE) or bits != 16:
+                    raise ValueError("Only 16-bit PCM WAV files are supported")
+                size = min(size, len(mm) - body)
+                self.sample_rate = rate
+                self.channels = channels
+                self.frames = size // (2 * channels)
+                self._data = np.frombuffer(mm, dtype=np.int16, count=self.frames * channels, offset=body)
+                return
+            pos = body + size + (size & 1)
+
+        raise ValueError(f"{self.path} has no audio data")
+
+    def read(self, start, end):
+        """Return mono int16 samples for the frame range [start, end)"""
+        if self._data is not None:
+            block = self._data[start * self.channels:end * self.channels]
+        else:
+            block = soundfile.read(self.path, start=start, stop=end, dtype="int16", always_2d=True)[0]
+            block = block.reshape(-1)
+        return to_mono(block, self.channels)
+
+    def blocks(self, block_frames):
+        """Yield (start_frame, mono samples) blocks covering the whole file"""
+        if self._data is not None:
+            for start in range(0, self.frames, block_frames):
+                yield start, self.read(start, min(start + block_frames, self.frames))
+        else:
+            start = 0
+            for block in soundfile.blocks(self.path, blocksize=block_frames, dtype="int16", always_2d=True):
+                yield start, to_mono(block.reshape(-1), self.channels)
+                start += len(block)
+
+    def close(self):
+        """Release the memory map and file handle"""
+        self._data = None
+        if self._mmap:
+            self._mmap.close()
+            self._mmap = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+def to_mono(samples, channels):
+    """Average interleaved channels down to one (no copy for mono input)"""
+    if channels == 1:
+        return samples
+    frames = samples.reshape(-1, channels).astype(np.int32)
+    return (frames.sum(axis=1) // channels).astype(np.int16)
+
+def split_at_silence(audio, threshold=FILE_SILENCE_THRESHOLD, min_silence_ms=FILE_MIN_SILENCE_MS,
+                     min_chunk_ms=FILE_MIN_CHUNK_MS, max_chunk_seconds=FILE_MAX_CHUNK_SECONDS,
+                     pad_ms=FILE_CHUNK_PAD_MS):
+    """Yield (start_frame, end_frame) utterance ranges, cutting in the middle of pauses"""
+    rate = audio.sample_rate
+    frame_len = max(1, int(rate * VAD_FRAME_MS / 1000))
+    min_silence = max(1, min_silence_ms // VAD_FRAME_MS)
+    min_voiced = max(1, min_chunk_ms // VAD_FRAME_MS)
+    max_frames = int(max_chunk_seconds * 1000 // VAD_FRAME_MS)
+    pad = int(rate * pad_ms / 1000)
+
+    noise = threshold / VAD_NOISE_RATIO
+    level = threshold
+    frame_index = 0  # index of the next analysis frame
+    speech_start = None  # first voiced frame of the current utterance
+    last_voiced = None
+    voiced_count = 0
+
+    def emit(first, last):
+        start = max(0, first * frame_len - pad)
+        end = min(audio.frames, (last + 1) * frame_len + pad)
+        return start, end
+
+    for _, block in audio.blocks(frame_len * 1000):
+        for energy in frame_rms(block, frame_len):
+            voiced = energy > level
+            if not voiced:
+                noise = 0.95 * noise + 0.05 * float(energy)
+                level = max(threshold, noise * VAD_NOISE_RATIO)
+
+            if voiced:
+                if speech_start is None:
+                    speech_start = frame_index
+                    voiced_count = 0
+                last_voiced = frame_index
+                voiced_count += 1
+            elif speech_start is not None and frame_index - last_voiced >= min_silence:
+                if voiced_count >= min_voiced:
+                    yield emit(speech_start, last_voiced)
+                speech_start = None
+
+            if speech_start is not None and frame_index - speech_start + 1 >= max_frames:
+                yield emit(speech_start, frame_index)
+                speech_start = None
+
+            frame_index += 1
+
+    if speech_start is not None and voiced_count >= min_voiced:
+        yield emit(speech_start, last_voiced)
+
+_worker_files = {}
+
+def _transcribe_chunk(path, start, end, language):
+    """Transcribe one range of a file (runs inside a pool worker)"""
+    import speech_recognition as sr
+
+    audio = _worker_files.get(path)
+    if audio is None:
+        audio = _worker_files[path] = AudioFile(path)
+
+    samples = resample(audio.read(start, end), audio.sample_rate, AUDIO_TARGET_RATE)
+    data = sr.AudioData(samples.tobytes(), AUDIO_TARGET_RATE, 2)
+    try:
+        return sr.Recognizer().recognize_google(data, language=language), None
+    except sr.UnknownValueError:
+        return "", None
+    except sr.RequestError as e:
+        return "", f"Speech recognition error: {e}"
+
+def transcribe_file(path, workers=TRANSCRIBE_WORKERS, language="en-US"):
+    """Yield (start_seconds, end_seconds, text, error) for each utterance in timestamp order"""
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("File transcription needs NumPy (pip install numpy)")
+
+    audio = AudioFile(path)
+    rate = audio.sample_rate
+    workers = workers or os.cpu_count() or 1
+    pending = deque()
+
+    def result(item):
+        start, end, future = item
+        try:
+            text, error = future.result()
+        except Exception as e:
+            text, error = "", str(e)
+        return start / rate, end / rate, text, error
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for start, end in split_at_silence(audio):
+            pending.append((start, end, pool.submit(_transcribe_chunk, path, start, end, language)))
+
+            # Bound the work in flight so memory stays flat on long files
+            while len(pending) >= workers * 2 or (pending and pending[0][2].done()):
+                yield result(pending.popleft())
+
+        while pending:
+            yield result(pending.popleft())
+    finally:
+        # Drop queued chunks before shutdown waits, in case the caller stopped early
+        for _, _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+        audio.close()
+
+def format_offset(seconds):
+    """Format a file offset as H:MM:SS.s"""
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours}:{minutes:02d}:{seconds:04.1f}"
+
+def run_transcription(path, assistant=None, workers=TRANSCRIBE_WORKERS):
+    """Print transcripts as they arrive, optionally routing them through process_command"""
+    for start, end, text, error in transcribe_file(path, workers=workers):
+        stamp = f"[{format_offset(start)} - {format_offset(end)}]"
+        if error:
+            print(f"{stamp} (error: {error})")
+            log_error(error, "transcribe_file", offset=start)
+            continue
+        if not text:
+            continue
+
+        print(f"{stamp} You: {text}")
+        if assistant:
+            response, _ = assistant.process_command(text, priority=PRIORITY_BATCH)
+            print(f"{stamp} KiddoBot: {response}")
@@ -7,6 +7,7 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
 from voice_assistant import VoiceAssistant
+from utils import log_error
 
 class VoiceAssistantGUI:
     def __init__(self, root, assistant):
@@ -166,10 +167,11 @@ class VoiceAssistantGUI:
                 
                 # Speak the response
                 if response and not any(word in message.lower() for word in ["stop", "quit", "bye"]):
-                    threading.Thread(target=self.assistant.speak, args=(response,), daemon=True).start()
+                    self.assistant.speak(response)
                 
             except Exception as e:
                 error_msg = f"Error processing message: {str(e)}"
+                log_error(e, "send_text_message")
                 self.root.after(0, lambda: self.add_message(error_msg, "system"))
                 self.root.after(0, lambda: self.status_var.set("Error occurred"))
         
@@ -187,9 +189,7 @@ class VoiceAssistantGUI:
             def voice_callback(message, sender):
                 self.root.after(0, lambda: self.add_message(message, sender))
                 if sender == "KiddoBot":
-                    self.root.after(0, lambda: threading.Thread(
-                        target=self.assistant.speak, args=(message,), daemon=True
-                    ).start())
+                    self.assistant.speak(message)
             
             self.voice_thread = self.assistant.start_listening_loop(callback=voice_callback)
             
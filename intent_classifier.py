@@ -0,0 +1,310 @@
+"""
+Intent Classifier Module
+Local hashed n-gram classifier that catches paraphrases of built-in
+commands before they fall through to OpenAI
+"""
+
+import re
+import time
+import zlib
+from config import INTENT_FEATURES, INTENT_THRESHOLD, INTENT_MARGIN
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Labelled examples per intent; "other" soaks up questions meant for OpenAI
+INTENT_EXAMPLES = {
+    "greeting": [
+        "good morning", "good afternoon", "good evening", "howdy", "hiya", "yo kiddobot",
+        "what's up", "whats up buddy", "nice to meet you", "greetings friend", "sup",
+        "how are you doing", "how's it going",
+    ],
+    "time": [
+        "what's the clock say", "whats the clock say", "what hour is it", "do you know the clock",
+        "what day is it", "which day of the week is it", "current hour please", "how late is it",
+        "is it morning or afternoon", "what month is it", "what year is it", "tell me the hour",
+        "check the clock",
+    ],
+    "joke": [
+        "make me giggle", "crack me up", "tell me something hilarious", "say a pun",
+        "cheer me up with something silly", "got any good one liners", "knock knock",
+        "say something to make me smile", "i want to hear something silly", "tell me a gag",
+        "do you know any puns", "make me chuckle",
+    ],
+    "other": [
+        "why is the sky blue", "explain photosynthesis", "how do magnets work",
+        "what should i eat for dinner", "write me a poem about cats", "help me with my math homework",
+        "how far away is the moon", "can dogs eat chocolate", "how do i make friends",
+        "translate hello into spanish", "what is two plus two", "how many legs does a spider have",
+        "recommend a good book", "why do cats purr", "how does a rainbow form",
+        # Near misses that borrow greeting, time or joke wording
+        "whats up with dinosaurs", "whats up with the ocean", "how are you doing at chess",
+        "how are you at drawing", "how is it going in space", "how do you say good night in german",
+        "how do clocks work", "what year was the eiffel tower built", "which month has the most days",
+        "why is a pun funny", "what is the hour hand for", "good movies for kids",
+    ],
+}
+
+# Utterances (not in INTENT_EXAMPLES) the margin and content-word rule were
+# tuned on; "other" must never be answered locally, since a canned reply to a
+# real question is worse than a round trip to OpenAI
+INTENT_TUNING = {
+    "greeting": [
+        "good morning kiddobot", "howdy partner", "whats up kiddo", "how are you doing today",
+        "hows it going buddy", "nice to see you", "morning", "good evening friend", "greetings", "how are you",
+    ],
+    "time": [
+        "whats the clock saying", "what hour is it now", "what day is it today", "what month are we in",
+        "do you know what day it is", "is it afternoon yet", "whats the current hour", "what year are we in",
+        "check the clock please",
+    ],
+    "joke": [
+        "make me giggle please", "crack me up kiddobot", "tell me something silly", "got any puns",
+        "say something hilarious", "do you know any good one liners", "make me chuckle please", "cheer me up",
+        "say a silly pun",
+    ],
+    "other": [
+        "whats up with volcanoes", "how are you doing with math", "whats up with the weather tomorrow",
+        "how does a clock work", "why do we have months", "who invented the calendar",
+        "what year did people land on the moon", "how is it going on mars", "how do you say good morning in french",
+        "why are puns so silly", "how many days are in a year", "what makes a gag reflex", "how are volcanoes made",
+        "whats the biggest animal", "can you help me study for my test", "what should i name my puppy",
+        "how do clocks know the hour", "what day was i born on if i am ten", "how are rainbows made",
+        "good books about dinosaurs", "what day is christmas", "what month is my birthday in",
+        "hows the weather going",
+    ],
+}
+
+# Written after tuning and never used to adjust examples or settings; this is
+# the set whose precision evaluate() reports by default
+INTENT_TEST = {
+    "greeting": [
+        "good afternoon buddy", "yo kiddo", "hows everything going", "greetings kiddobot", "nice meeting you",
+        "sup buddy", "how are things", "good morning to you",
+    ],
+    "time": [
+        "what hour is it right now", "tell me the current hour", "which year is it", "what month is it now",
+        "is it morning yet", "do you know the hour", "what day of the week is it today", "how late is it now",
+    ],
+    "joke": [
+        "crack me up please", "tell me a silly gag", "make me giggle again", "got a pun for me",
+        "say something silly", "cheer me up please", "i want something hilarious", "any good one liners",
+    ],
+    "other": [
+        "what day is thanksgiving", "what month does summer start", "how is the weather in paris",
+        "whats up with black holes", "how are you doing on your science project", "what year was i born if i am eight",
+        "what time zone is japan in", "how late do owls stay up", "make me a sandwich recipe",
+        "tell me something about sharks", "say hello in japanese", "why do clocks tick", "how many hours are in a week",
+        "what month has halloween", "crack an egg how", "why do people giggle", "good morning song lyrics",
+        "how are pearls made", "what day of the week was july fourth", "cheer up songs for kids",
+    ],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+# Words that say nothing about what is being asked; every other word of an
+# utterance must appear in some example of the intent it is matched to
+_FILLER_WORDS = frozenset("""
+    a an the is it its are am be you your me my i we us our to of in on at for with and or
+    do does did can could would will please now right any some what whats how hows
+    kiddobot kiddo buddy friend there again just so yet tell say know got get give let today
+""".split())
+
+def _stem(word):
+    """Strip a plural or verb ending so 'puns' matches 'pun' and 'saying' matches 'say'"""
+    for suffix in ("ing", "ed", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+def content_words(text):
+    """Stemmed non-filler words of an utterance"""
+    stems = (_stem(w) for w in _TOKEN_RE.findall(text.lower().replace("'", "")) if w not in _FILLER_WORDS)
+    return {w for w in stems if w not in _FILLER_WORDS}
+
+def extract_features(text):
+    """Word unigrams, word bigrams and character 3-grams of a lowercased utterance"""
+    words = _TOKEN_RE.findall(text.lower().replace("'", ""))
+    features = [f"w:{w}" for w in words]
+    features += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"<{w}>"
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return features
+
+def hash_features(text, dim=INTENT_FEATURES):
+    """Return (indices, values) of the L2-normalized hashed feature vector"""
+    buckets = {}
+    for feature in extract_features(text):
+        h = zlib.crc32(feature.encode("utf-8"))
+        # Signed hashing keeps collisions from always adding up
+        sign = 1.0 if h & 0x80000000 else -1.0
+        index = h % dim
+        buckets[index] = buckets.get(index, 0.0) + sign
+    if not buckets:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.float32)
+
+    indices = np.fromiter(buckets.keys(), dtype=np.intp, count=len(buckets))
+    values = np.fromiter(buckets.values(), dtype=np.float32, count=len(buckets))
+    norm = np.sqrt(np.dot(values, values))
+    return indices, values / norm if norm else values
+
+def vectorize_many(texts, dim=INTENT_FEATURES):
+    """Hashed feature vectors for several utterances as an (n, dim) matrix"""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        indices, values = hash_features(text, dim)
+        matrix[row, indices] = values
+    return matrix
+
+class IntentClassifier:
+    def __init__(self, examples=None, threshold=INTENT_THRESHOLD, margin=INTENT_MARGIN, dim=INTENT_FEATURES):
+        """Build the example matrix from labelled utterances"""
+        examples = examples or INTENT_EXAMPLES
+        self.threshold = threshold
+        self.margin = margin
+        self.dim = dim
+
+        self.labels = list(examples)
+        texts = []
+        owners = []
+        for label_index, label in enumerate(self.labels):
+            texts += examples[label]
+            owners += [label_index] * len(examples[label])
+
+        # Rows grouped by label so per-intent maxima are one reduceat call
+        self.examples = vectorize_many(texts, dim)
+        self.examples_t = np.ascontiguousarray(self.examples.T)
+        self.owners = np.array(owners, dtype=np.intp)
+        self.starts = np.flatnonzero(np.r_[True, self.owners[1:] != self.owners[:-1]])
+        self.other = self.labels.index("other") if "other" in self.labels else None
+        self.vocab = [set().union(*(content_words(text) for text in examples[label])) for label in self.labels]
+
+    def _decide(self, intent_scores, words):
+        """Map per-intent scores and the utterance's content words to (intent or None, score)"""
+        best = int(np.argmax(intent_scores))
+        score = float(intent_scores[best])
+        label = self.labels[best]
+        if label == "other" or score < self.threshold:
+            return None, score
+        # Questions that merely share wording with a command stay close to "other"
+        if self.other is not None and score - float(intent_scores[self.other]) < self.margin:
+            return None, score
+        # A topic no example covers ("what day is christmas") means a real question
+        if words - self.vocab[best]:
+            return None, score
+        return label, score
+
+    def classify(self, text):
+        """Return (intent, cosine score) for one utterance; intent is None below threshold"""
+        indices, values = hash_features(text, self.dim)
+        if not len(indices):
+            return None, 0.0
+        # Sparse dot: only the columns this utterance touches
+        similarities = values @ self.examples_t[indices]
+        return self._decide(np.maximum.reduceat(similarities, self.starts), content_words(text))
+
+    def classify_many(self, texts):
+        """Classify a batch of utterances, hashing and scoring all of them in array operations"""
+        if not texts:
+            return []
+        n = len(texts)
+        feature_lists = [extract_features(text) for text in texts]
+        lengths = np.array([len(features) for features in feature_lists], dtype=np.intp)
+        if not lengths.any():
+            return [(None, 0.0)] * n
+
+        # Hash each distinct feature once for the whole batch
+        codes = {}
+        feature_codes = np.array([codes.setdefault(f, len(codes)) for features in feature_lists for f in features],
+                                 dtype=np.intp)
+        hashes = np.array([zlib.crc32(f.encode("utf-8")) for f in codes], dtype=np.uint32)[feature_codes]
+        signs = np.where(hashes & 0x80000000, 1.0, -1.0)
+
+        # Sum colliding features per utterance, then L2-normalize each utterance
+        rows = np.repeat(np.arange(n), lengths)
+        keys, inverse = np.unique(rows * self.dim + hashes % self.dim, return_inverse=True)
+        values = np.bincount(inverse, weights=signs)
+        key_rows = keys // self.dim
+        norms = np.sqrt(np.bincount(key_rows, weights=values * values, minlength=n))
+        values = (values / np.where(norms > 0, norms, 1.0)[key_rows]).astype(np.float32)
+
+        contributions = self.examples_t[keys % self.dim] * values[:, None]
+        nonempty = lengths > 0
+        similarities = np.zeros((n, len(self.owners)), dtype=np.float32)
+        similarities[nonempty] = np.add.reduceat(contributions, np.searchsorted(key_rows, np.flatnonzero(nonempty)),
+                                                 axis=0)
+
+        intent_scores = np.maximum.reduceat(similarities, self.starts, axis=1)
+        best = np.argmax(intent_scores, axis=1)
+        scores = intent_scores[np.arange(n), best]
+        accepted = nonempty & (scores >= self.threshold)
+        if self.other is not None:
+            accepted &= (best != self.other) & (scores - intent_scores[:, self.other] >= self.margin)
+        accepted &= [not content_words(text) - self.vocab[b] for text, b in zip(texts, best)]
+        return [(self.labels[b], float(sc)) if ok else (None, float(sc) if ne else 0.0)
+                for b, sc, ok, ne in zip(best, scores, accepted, nonempty)]
+
+def benchmark(repeats=2000):
+    """Time single and batched classification and show a few paraphrases"""
+    if not NUMPY_AVAILABLE:
+        print("NumPy is not installed")
+        return {}
+
+    classifier = IntentClassifier()
+    samples = ["whats the clock say", "make me giggle", "howdy partner", "why do birds sing",
+               "explain how volcanoes erupt", "could you crack a funny one", "what day of the month is it"]
+    for text in samples:
+        intent, score = classifier.classify(text)
+        print(f"{text:35} -> {intent or 'openai':9} ({score:.2f})")
+
+    start = time.perf_counter()
+    for i in range(repeats):
+        classifier.classify(samples[i % len(samples)])
+    single_us = (time.perf_counter() - start) / repeats * 1e6
+
+    batch = samples * 100
+    start = time.perf_counter()
+    classifier.classify_many(batch)
+    batch_us = (time.perf_counter() - start) / len(batch) * 1e6
+
+    print(f"classify: {single_us:.1f} us per utterance")
+    print(f"classify_many: {batch_us:.1f} us per utterance (batch of {len(batch)})")
+    return {"single_us": single_us, "batch_us": batch_us}
+
+def evaluate(classifier=None, heldout=INTENT_TEST):
+    """Precision and recall of local answers on labelled utterances (the untuned test set by default)"""
+    if not NUMPY_AVAILABLE:
+        print("NumPy is not installed")
+        return {}
+
+    classifier = classifier or IntentClassifier()
+    texts = [text for texts in heldout.values() for text in texts]
+    expected = [label for label, texts in heldout.items() for _ in texts]
+    predicted = [intent for intent, _ in classifier.classify_many(texts)]
+
+    answered = [(text, want, got) for text, want, got in zip(texts, expected, predicted) if got]
+    wrong = [(text, want, got) for text, want, got in answered if got != want]
+    commands = sum(1 for label in expected if label != "other")
+    results = {
+        "utterances": len(texts),
+        "precision": (len(answered) - len(wrong)) / len(answered) if answered else 1.0,
+        "recall": (len(answered) - len(wrong)) / commands if commands else 1.0,
+        "wrong": wrong,
+    }
+    print(f"precision: {results['precision']:.2f}, recall: {results['recall']:.2f} ({len(texts)} utterances)")
+    for text, want, got in wrong:
+        print(f"  '{text}' answered as {got} (expected {want})")
+    return results
+
+if __name__ == "__main__":
+    import sys
+    benchmark()
+    print("tuning set:")
+    evaluate(heldout=INTENT_TUNING)
+    print("test set:")
+    sys.exit(1 if evaluate().get("wrong") else 0)
@@ -0,0 +1,242 @@
+"""
+LLM Scheduler Module
+Rate-limited, prioritized and deduplicated access to the OpenAI client
+"""
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from config import (
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_CONCURRENCY,
+    LLM_REQUEST_TIMEOUT,
+)
+
+# Priority classes (lower runs first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=None):
+        """Initialize a bucket refilled at rate_per_minute, holding at most capacity"""
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        """Add the tokens earned since the last update"""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until amount can be taken (0 if available now)"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        """Remove amount from the bucket (may go negative when correcting estimates)"""
+        self._refill()
+        self.level -= amount
+
+    def give(self, amount):
+        """Return unused tokens to the bucket"""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+class _Job:
+    def __init__(self, key, request, tokens):
+        """Hold one deduplicated request and the future its callers share"""
+        self.key = key
+        self.request = request
+        self.tokens = tokens
+        self.future = Future()
+        self.started = False
+        self.waiters = 1
+
+def estimate_tokens(request):
+    """Rough token cost of a chat request (prompt chars / 4 plus the completion budget)"""
+    chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+    return chars // 4 + int(request.get("max_tokens") or 256)
+
+class LLMScheduler:
+    def __init__(self, client, requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=LLM_TOKENS_PER_MINUTE, max_concurrency=LLM_MAX_CONCURRENCY):
+        """Initialize the scheduler in front of an OpenAI client"""
+        self.client = client
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority, seq, job)
+        self._seq = itertools.count()
+        self._inflight = {}  # request key -> job
+        self._active = 0
+        self._executor = None
+        self._dispatcher = None
+
+        # Counters for diagnostics
+        self.stats = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0, "abandoned": 0, "warmups": 0}
+
+    def submit(self, priority=PRIORITY_INTERACTIVE, **request):
+        """Queue a chat completion request and return a Future for its response"""
+        return self._submit(priority, request).future
+
+    def _submit(self, priority, request):
+        """Queue a request, joining an identical in-flight one if there is one"""
+        key = json.dumps(request, sort_keys=True, default=str)
+        with self._cond:
+            self.stats["submitted"] += 1
+            job = self._inflight.get(key)
+            if job and not job.future.cancelled():
+                # Share the in-flight request; bump it if a more urgent caller arrives
+                job.waiters += 1
+                self.stats["coalesced"] += 1
+                if not job.started:
+                    heapq.heappush(self._queue, (priority, next(self._seq), job))
+                    self._cond.notify_all()
+                return job
+
+            job = _Job(key, request, estimate_tokens(request))
+            self._inflight[key] = job
+            heapq.heappush(self._queue, (priority, next(self._seq), job))
+            self._ensure_started()
+            self._cond.notify_all()
+            return job
+
+    def create(self, priority=PRIORITY_INTERACTIVE, timeout=LLM_REQUEST_TIMEOUT, **request):
+        """Blocking helper: schedule a request and wait for its response"""
+        job = self._submit(priority, request)
+        try:
+            return job.future.result(timeout=timeout)
+        except FutureTimeout:
+            self._abandon(job)
+            raise
+
+    def _abandon(self, job):
+        """Drop a caller that gave up; unsent jobs nobody waits for are cancelled"""
+        with self._cond:
+            job.waiters -= 1
+            if job.waiters > 0 or job.started:
+                return
+            # Not sent yet, so it costs no rate budget; the dispatcher skips it
+            job.future.cancel()
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            self.stats["abandoned"] += 1
+            self._cond.notify_all()
+
+    def warm_up(self, model):
+        """Fetch a model record to open a connection, if the request budget allows; returns whether it ran"""
+        with self._cond:
+            if self.request_bucket.wait_time(1) > 0:
+                # Never spend budget a real question is about to need
+                return False
+            self.request_bucket.take(1)
+            self.stats["warmups"] += 1
+        self.client.models.retrieve(model)
+        return True
+
+    def _ensure_started(self):
+        """Start the dispatcher thread and worker pool on first use"""
+        if self._dispatcher and self._dispatcher.is_alive():
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="LLMWorker")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="LLMDispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def _next_job(self):
+        """Peek at the most urgent job that has not started or been cancelled"""
+        while self._queue:
+            job = self._queue[0][2]
+            if not (job.started or job.future.cancelled()):
+                return job
+            heapq.heappop(self._queue)
+            if job.future.cancelled() and self._inflight.get(job.key) is job:
+                # A caller cancelled submit()'s future; later identical requests start afresh
+                del self._inflight[job.key]
+        return None
+
+    def _dispatch_loop(self):
+        """Hand jobs to the worker pool in priority order as limits allow"""
+        with self._cond:
+            while True:
+                job = self._next_job()
+                if job is None or self._active >= self.max_concurrency:
+                    self._cond.wait()
+                    continue
+
+                wait = max(self.request_bucket.wait_time(1), self.token_bucket.wait_time(job.tokens))
+                if wait > 0:
+                    # Re-check afterwards: a more urgent job may have arrived meanwhile
+                    self._cond.wait(wait)
+                    continue
+
+                heapq.heappop(self._queue)
+                job.started = True
+                self.request_bucket.take(1)
+                self.token_bucket.take(job.tokens)
+                self._active += 1
+                self._executor.submit(self._run, job)
+
+    def _run(self, job):
+        """Execute one request and deliver the result to every waiter"""
+        try:
+            if not job.future.set_running_or_notify_cancel():
+                return
+            response = self.client.chat.completions.create(**job.request)
+        except Exception as e:
+            with self._cond:
+                self.stats["failed"] += 1
+            job.future.set_exception(e)
+        else:
+            used = getattr(getattr(response, "usage", None), "total_tokens", None)
+            with self._cond:
+                self.stats["completed"] += 1
+                if used is not None:
+                    # Correct the up-front estimate with what was actually billed
+                    if used < job.tokens:
+                        self.token_bucket.give(job.tokens - used)
+                    else:
+                        self.token_bucket.take(used - job.tokens)
+            job.future.set_result(response)
+        finally:
+            with self._cond:
+                self._active -= 1
+                if self._inflight.get(job.key) is job:
+                    del self._inflight[job.key]
+                self._cond.notify_all()
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def configure_llm_scheduler(client, **limits):
+    """Create the process-wide scheduler around client; only allowed before it is first used"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            raise RuntimeError("The LLM scheduler is already configured")
+        _scheduler = LLMScheduler(client, **limits)
+        return _scheduler
+
+def get_llm_scheduler():
+    """Get the process-wide scheduler, creating it with the default OpenAI client if needed"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from openai import OpenAI
+                _scheduler = LLMScheduler(OpenAI(api_key=os.getenv("OPENAI_API_KEY", "your-api-key-here")))
+    return _scheduler
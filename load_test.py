@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Load Test Module
+Drives VoiceAssistant.process_text_input with simulated concurrent users
+against local stand-ins for OpenAI and Wikipedia
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+import utils
+import voice_assistant
+from voice_assistant import VoiceAssistant
+from llm_scheduler import configure_llm_scheduler
+from profiler import add_profile_args, start_profiler
+
+# Utterances per intent; weights come from --mix
+UTTERANCES = {
+    "greeting": ["hello there", "hi kiddobot", "hey buddy"],
+    "time": ["what time is it", "what is the date today", "tell me the time"],
+    "wikipedia": ["tell me about dinosaurs", "who is albert einstein", "tell me about the moon", "search for volcanoes"],
+    "joke": ["tell me a joke", "say something funny", "make me laugh"],
+    "openai": ["why is the sky blue", "how do airplanes fly", "can you help me with my homework",
+               "how many legs does a spider have", "why do cats purr"],
+}
+DEFAULT_MIX = "openai=4,wikipedia=2,time=1,joke=1,greeting=1"
+
+class FakeService:
+    def __init__(self, latency, jitter, failure_rate, rng):
+        """Simulated backend with injectable latency and failures"""
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = rng
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def wait(self, name):
+        """Sleep for the simulated latency, then fail with the configured probability"""
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            delay = max(0.0, self.rng.gauss(self.latency, self.jitter))
+            fail = self.rng.random() < self.failure_rate
+        try:
+            time.sleep(delay)
+            if fail:
+                raise RuntimeError(f"Simulated {name} failure")
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+class FakeOpenAI(FakeService):
+    def __init__(self, *args):
+        """Stand-in for the OpenAI client (chat.completions.create, models.retrieve)"""
+        super().__init__(*args)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.models = SimpleNamespace(retrieve=lambda model: SimpleNamespace(id=model))
+
+    def create(self, **request):
+        """Return a canned completion after the simulated delay"""
+        self.wait("OpenAI")
+        question = request["messages"][-1]["content"]
+        message = SimpleNamespace(content=f"Here is a short answer about {question}.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                               usage=SimpleNamespace(total_tokens=60))
+
+class FakeWikipedia(FakeService):
+    def __init__(self, *args, exceptions=None):
+        """Stand-in for the wikipedia module (summary plus the real exception types)"""
+        super().__init__(*args)
+        self.exceptions = exceptions
+
+    def summary(self, query, sentences=2):
+        """Return a canned summary after the simulated delay"""
+        self.wait("Wikipedia")
+        return f"{query.title()} is a topic with a fairly long history. It is studied by many people."
+
+class TimedFunction:
+    def __init__(self, fn):
+        """Wrap fn and record how long each call takes"""
+        self.fn = fn
+        self.lock = threading.Lock()
+        self.durations = []
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.durations.append(elapsed)
+
+def parse_mix(text):
+    """Parse 'intent=weight,...' into a {intent: weight} dict"""
+    mix = {}
+    for part in text.split(","):
+        intent, _, weight = part.partition("=")
+        intent = intent.strip()
+        if intent not in UTTERANCES:
+            raise ValueError(f"Unknown intent '{intent}' (choose from {', '.join(UTTERANCES)})")
+        mix[intent] = float(weight or 1)
+    return mix
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+def memory_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_stage(assistant, users, duration, think_time, mix, unique, sample_interval, seed):
+    """Run one load level and return its results"""
+    intents = list(mix)
+    weights = [mix[i] for i in intents]
+    results = []
+    results_lock = threading.Lock()
+    stop = threading.Event()
+    timeline = []
+
+    def user(user_id):
+        rng = random.Random(seed * 1000 + user_id)
+        # Spread the first requests over one think time
+        if stop.wait(rng.uniform(0, think_time)):
+            return
+        while not stop.is_set():
+            intent = rng.choices(intents, weights)[0]
+            text = rng.choice(UTTERANCES[intent])
+            if unique and intent == "openai":
+                text = f"{text} number {user_id}"
+            start = time.perf_counter()
+            try:
+                response = assistant.process_text_input(text)
+                ok = not response.startswith("Sorry")
+            except Exception:
+                ok = False
+            latency = time.perf_counter() - start
+            with results_lock:
+                results.append((time.perf_counter(), intent, latency, ok))
+            stop.wait(rng.expovariate(1.0 / think_time) if think_time > 0 else 0)
+
+    def monitor():
+        started = time.perf_counter()
+        while not stop.wait(sample_interval):
+            now = time.perf_counter()
+            with results_lock:
+                recent = [r[2] for r in results if r[0] >= now - sample_interval]
+            timeline.append({
+                "t": round(now - started, 1),
+                "completed": len(recent),
+                "p99_ms": round(percentile(recent, 99) * 1000, 1),
+                "threads": threading.active_count(),
+                "memory_mb": round(memory_mb(), 1),
+            })
+
+    threads = [threading.Thread(target=user, args=(i,), name=f"LoadUser-{i}", daemon=True) for i in range(users)]
+    watcher = threading.Thread(target=monitor, name="LoadMonitor", daemon=True)
+    started = time.perf_counter()
+    watcher.start()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    watcher.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [r[2] for r in results]
+    per_intent = {}
+    for intent in intents:
+        values = [r[2] for r in results if r[1] == intent]
+        if values:
+            per_intent[intent] = {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+            }
+    return {
+        "users": users,
+        "requests": len(results),
+        "errors": sum(1 for r in results if not r[3]),
+        "throughput_rps": round(len(results) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "peak_threads": max((s["threads"] for s in timeline), default=threading.active_count()),
+        "peak_memory_mb": max((s["memory_mb"] for s in timeline), default=round(memory_mb(), 1)),
+        "per_intent": per_intent,
+        "timeline": timeline,
+    }
+
+def build_assistant(args):
+    """Create a headless assistant wired to the fake backends"""
+    rng = random.Random(args.seed)
+    openai_fake = FakeOpenAI(args.openai_latency / 1000, args.openai_jitter / 1000, args.openai_failure_rate, rng)
+    wiki_fake = FakeWikipedia(args.wiki_latency / 1000, args.wiki_jitter / 1000, args.wiki_failure_rate, rng,
+                              exceptions=voice_assistant.wikipedia.exceptions)
+
+    # Keep the real conversation history out of the test
+    utils.HISTORY_FILE = os.path.join(tempfile.mkdtemp(prefix="kiddo_load_"), "kiddo_history.txt")
+
+    # Patch module-level backends used by process_command
+    voice_assistant.wikipedia = wiki_fake
+    voice_assistant.webbrowser = SimpleNamespace(open=lambda url: True)
+    save_timer = TimedFunction(voice_assistant.save_conversation)
+    voice_assistant.save_conversation = save_timer
+
+    # Set up the shared scheduler before the assistant picks it up
+    limits = {}
+    if args.llm_rpm is not None:
+        limits["requests_per_minute"] = args.llm_rpm
+    if args.llm_tpm is not None:
+        limits["tokens_per_minute"] = args.llm_tpm
+    if args.llm_concurrency is not None:
+        limits["max_concurrency"] = args.llm_concurrency
+    configure_llm_scheduler(openai_fake, **limits)
+
+    assistant = VoiceAssistant(enable_audio=False)
+    return assistant, openai_fake, wiki_fake, save_timer
+
+def print_stage(stage):
+    """Print a one-stage summary"""
+    print(f"\n{stage['users']} users: {stage['requests']} requests, {stage['errors']} errors, "
+          f"{stage['throughput_rps']} req/s, p50 {stage['p50_ms']}ms, p99 {stage['p99_ms']}ms, "
+          f"peak {stage['peak_threads']} threads, {stage['peak_memory_mb']} MB")
+    for intent, values in stage["per_intent"].items():
+        print(f"  {intent:10} n={values['count']:<6} p50 {values['p50_ms']:8.1f}ms  p99 {values['p99_ms']:8.1f}ms")
+    print("  t(s)   done  p99(ms)  threads  MB")
+    for sample in stage["timeline"]:
+        print(f"  {sample['t']:5.1f} {sample['completed']:6d} {sample['p99_ms']:8.1f} {sample['threads']:8d} {sample['memory_mb']:6.1f}")
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="KiddoBot text-path load generator")
+    parser.add_argument("--users", default="1,2,4,8,16",
+                        help="comma-separated concurrent user counts, run one stage each (default: 1,2,4,8,16)")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per stage (default: 20)")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean seconds between a user's requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"intent weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--unique", action="store_true",
+                        help="make every OpenAI question unique so identical requests are not coalesced")
+    parser.add_argument("--openai-latency", type=float, default=800, help="mean fake OpenAI latency in ms")
+    parser.add_argument("--openai-jitter", type=float, default=200, help="OpenAI latency std-dev in ms")
+    parser.add_argument("--openai-failure-rate", type=float, default=0.0, help="fraction of OpenAI calls that fail")
+    parser.add_argument("--wiki-latency", type=float, default=400, help="mean fake Wikipedia latency in ms")
+    parser.add_argument("--wiki-jitter", type=float, default=100, help="Wikipedia latency std-dev in ms")
+    parser.add_argument("--wiki-failure-rate", type=float, default=0.0, help="fraction of Wikipedia calls that fail")
+    parser.add_argument("--llm-rpm", type=float, help="override the scheduler's requests per minute")
+    parser.add_argument("--llm-tpm", type=float, help="override the scheduler's tokens per minute")
+    parser.add_argument("--llm-concurrency", type=int, help="override the scheduler's concurrency cap")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="seconds between timeline samples")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--json", metavar="FILE", help="also write the full report as JSON")
+    add_profile_args(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Run the load stages and print the report"""
+    args = parse_args(argv)
+    mix = parse_mix(args.mix)
+    assistant, openai_fake, wiki_fake, save_timer = build_assistant(args)
+
+    profiler = start_profiler(args)
+    stages = []
+    try:
+        for users in [int(u) for u in args.users.split(",")]:
+            calls_before = len(save_timer.durations)
+            stage = run_stage(assistant, users, args.duration, args.think_time, mix,
+                              args.unique, args.sample_interval, args.seed)
+            saves = save_timer.durations[calls_before:]
+            stage["save_conversation"] = {
+                "calls": len(saves),
+                "p50_ms": round(percentile(saves, 50) * 1000, 2),
+                "p99_ms": round(percentile(saves, 99) * 1000, 2),
+            }
+            stages.append(stage)
+            print_stage(stage)
+            print(f"  save_conversation: {len(saves)} calls, p50 {stage['save_conversation']['p50_ms']}ms, "
+                  f"p99 {stage['save_conversation']['p99_ms']}ms")
+    finally:
+        if profiler:
+            profiler.stop()
+
+    report = {
+        "stages": stages,
+        "openai": {"calls": openai_fake.calls, "peak_in_flight": openai_fake.peak_in_flight},
+        "wikipedia": {"calls": wiki_fake.calls, "peak_in_flight": wiki_fake.peak_in_flight},
+        "llm_scheduler": dict(assistant.llm_scheduler.stats),
+    }
+    print(f"\nOpenAI stand-in: {openai_fake.calls} calls, peak {openai_fake.peak_in_flight} in flight; "
+          f"scheduler {report['llm_scheduler']}")
+    print(f"Wikipedia stand-in: {wiki_fake.calls} calls, peak {wiki_fake.peak_in_flight} in flight")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    return report
+
+if __name__ == "__main__":
+    main()
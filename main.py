@@ -4,29 +4,83 @@ KiddoBot - A Python Desktop Voice Assistant
 Main entry point for the application
 """
 
-import tkinter as tk
-from gui_interface import VoiceAssistantGUI
-from voice_assistant import VoiceAssistant
+from utils import log_error, cleanup_temp_files
+from profiler import add_profile_args, start_profiler
+from config import DIAGNOSE_TIMEOUT
+import argparse
 import threading
 import sys
 
-def main():
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="KiddoBot - A Python Desktop Voice Assistant")
+    parser.add_argument("--transcribe", metavar="FILE",
+                        help="transcribe a WAV or FLAC recording instead of starting the GUI")
+    parser.add_argument("--process", action="store_true",
+                        help="with --transcribe, answer each utterance through the command pipeline")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="with --transcribe, number of worker processes (default: one per core)")
+    parser.add_argument("--diagnose", action="store_true",
+                        help="run environment checks and backend latency probes, then exit")
+    parser.add_argument("--diagnose-output", metavar="FILE",
+                        help="with --diagnose, write the JSON report to FILE instead of stdout")
+    parser.add_argument("--diagnose-timeout", type=float, default=DIAGNOSE_TIMEOUT, metavar="SECONDS",
+                        help=f"with --diagnose, time allowed for each check (default: {DIAGNOSE_TIMEOUT})")
+    add_profile_args(parser)
+    return parser.parse_args(argv)
+
+def run_gui():
+    """Start the desktop GUI"""
+    # Imported here so --diagnose still runs when audio or API packages are missing
+    import tkinter as tk
+    from gui_interface import VoiceAssistantGUI
+    from voice_assistant import VoiceAssistant
+
+    # Create the main tkinter window
+    root = tk.Tk()
+
+    # Initialize the voice assistant
+    assistant = VoiceAssistant()
+
+    # Create and setup the GUI
+    gui = VoiceAssistantGUI(root, assistant)
+
+    # Start the GUI main loop
+    root.mainloop()
+
+def run_file_transcription(args):
+    """Transcribe a recording without the GUI"""
+    from file_transcriber import run_transcription
+    from voice_assistant import VoiceAssistant
+
+    assistant = VoiceAssistant(enable_audio=False) if args.process else None
+    run_transcription(args.transcribe, assistant=assistant, workers=args.workers)
+
+def main(argv=None):
     """Main function to start the KiddoBot application"""
+    args = parse_args(argv)
+    profiler = start_profiler(args)
+    healthy = True
     try:
-        # Create the main tkinter window
-        root = tk.Tk()
-        
-        # Initialize the voice assistant
-        assistant = VoiceAssistant()
-        
-        # Create and setup the GUI
-        gui = VoiceAssistantGUI(root, assistant)
-        
-        # Start the GUI main loop
-        root.mainloop()
-        
+        if args.diagnose:
+            from diagnostics import run_and_report
+            healthy = run_and_report(args.diagnose_output, timeout=args.diagnose_timeout)
+        elif args.transcribe:
+            run_file_transcription(args)
+        else:
+            run_gui()
+
     except Exception as e:
         print(f"Error starting KiddoBot: {e}")
+        log_error(e, "main")
+        healthy = False
+    finally:
+        # Also runs on Ctrl-C, so an interrupted session still writes its profile
+        if profiler:
+            profiler.stop()
+        cleanup_temp_files()
+
+    if not healthy:
         sys.exit(1)
 
 if __name__ == "__main__":
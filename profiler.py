@@ -0,0 +1,235 @@
+"""
+Profiler Module
+Low-overhead sampling profiler across all threads with collapsed-stack,
+flamegraph SVG and hotspot summary output
+"""
+
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from html import escape
+from config import PROFILE_INTERVAL_MS, PROFILE_TOP_N
+
+class SamplingProfiler:
+    def __init__(self, output_prefix="kiddo_profile", interval_ms=PROFILE_INTERVAL_MS,
+                 duration=None, track_allocations=False, top_n=PROFILE_TOP_N):
+        """Initialize the profiler; outputs are written as <output_prefix>.folded/.svg/.txt"""
+        self.output_prefix = output_prefix
+        self.interval = interval_ms / 1000.0
+        self.duration = duration
+        self.track_allocations = track_allocations
+        self.top_n = top_n
+
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._written = False
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def start(self):
+        """Start sampling in a background thread"""
+        if self.track_allocations:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and write the reports (safe to call more than once)"""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._finish()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _run(self):
+        """Sample every thread's stack until stopped or the time window ends"""
+        own_id = threading.get_ident()
+        deadline = self.started_at + self.duration if self.duration else None
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.stacks[self._collapse(names.get(thread_id, f"thread-{thread_id}"), frame)] += 1
+            self.samples += 1
+            if deadline and time.perf_counter() >= deadline:
+                break
+        self._finish()
+
+    @staticmethod
+    def _collapse(thread_name, frame):
+        """Turn a frame chain into 'thread;outer;...;inner'"""
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        parts.append(thread_name.replace(";", ":"))
+        return ";".join(reversed(parts))
+
+    def _finish(self):
+        """Write reports once, from whichever of stop() or the time window comes first"""
+        with self._lock:
+            if self._written:
+                return
+            self._written = True
+            self.elapsed = time.perf_counter() - self.started_at
+            if self.track_allocations:
+                import tracemalloc
+                # Leave out the profiler's own bookkeeping (stack strings, counters)
+                self._snapshot = tracemalloc.take_snapshot().filter_traces([
+                    tracemalloc.Filter(False, __file__),
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                ])
+                tracemalloc.stop()
+
+        try:
+            self.write_collapsed(f"{self.output_prefix}.folded")
+            self.write_flamegraph(f"{self.output_prefix}.svg")
+            summary = self.summary()
+            with open(f"{self.output_prefix}.txt", "w", encoding="utf-8") as f:
+                f.write(summary)
+            print(summary)
+            print(f"Profile written to {self.output_prefix}.folded, .svg and .txt")
+        except Exception as e:
+            print(f"Error writing profile: {e}")
+
+    def write_collapsed(self, path):
+        """Write stacks in the collapsed format used by flamegraph.pl and speedscope"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+    def hotspots(self):
+        """Return (self_counts, inclusive_counts) per function"""
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for name in set(frames):
+                inclusive[name] += count
+        return own, inclusive
+
+    def summary(self):
+        """Top-N hotspot report as text"""
+        total = sum(self.stacks.values()) or 1
+        own, inclusive = self.hotspots()
+        lines = [
+            f"Sampling profile: {self.samples} samples over {self.elapsed:.1f}s "
+            f"every {self.interval * 1000:.0f}ms (wall clock, all threads)",
+            "",
+            f"Top {self.top_n} by self time:",
+        ]
+        for name, count in own.most_common(self.top_n):
+            lines.append(f"  {100.0 * count / total:5.1f}%  {count:7d}  {name}")
+        lines += ["", f"Top {self.top_n} by total time:"]
+        for name, count in inclusive.most_common(self.top_n):
+            lines.append(f"  {100.0 * count / total:5.1f}%  {count:7d}  {name}")
+
+        per_thread = Counter()
+        for stack, count in self.stacks.items():
+            per_thread[stack.split(";", 1)[0]] += count
+        lines += ["", "Samples per thread:"]
+        for name, count in per_thread.most_common():
+            lines.append(f"  {count:7d}  {name}")
+
+        if self._snapshot is not None:
+            lines += ["", f"Top {self.top_n} allocation sites (live at end):"]
+            for stat in self._snapshot.statistics("lineno")[:self.top_n]:
+                frame = stat.traceback[0]
+                lines.append(f"  {stat.size / 1024:9.1f} KiB  {stat.count:7d} blocks  "
+                             f"{os.path.basename(frame.filename)}:{frame.lineno}")
+        return "\n".join(lines) + "\n"
+
+    def write_flamegraph(self, path, width=1200, row_height=16):
+        """Render the collapsed stacks as a static flamegraph SVG"""
+        # Build a call tree: name -> [count, children]
+        root = [0, {}]
+        for stack, count in self.stacks.items():
+            node = root
+            node[0] += count
+            for name in stack.split(";"):
+                node = node[1].setdefault(name, [0, {}])
+                node[0] += count
+
+        rects = []
+
+        def layout(children, x, depth, scale):
+            for name, (count, grandchildren) in sorted(children.items()):
+                w = count * scale
+                if w >= 0.5:
+                    rects.append((x, depth, w, name, count))
+                    layout(grandchildren, x, depth + 1, scale)
+                x += w
+
+        total = root[0] or 1
+        layout(root[1], 0.0, 0, width / total)
+        max_depth = max((r[1] for r in rects), default=0) + 1
+        height = (max_depth + 2) * row_height
+
+        out = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'font-family="monospace" font-size="11">',
+            f'<text x="4" y="{row_height - 4}">KiddoBot profile: {self.samples} samples</text>',
+        ]
+        for x, depth, w, name, count in rects:
+            y = height - (depth + 1) * row_height
+            hue = zlib.crc32(name.encode("utf-8")) % 60
+            label = escape(name)
+            out.append(
+                f'<g><title>{label} ({count} samples, {100.0 * count / total:.1f}%)</title>'
+                f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row_height - 1}" '
+                f'fill="hsl({hue}, 90%, 60%)"/>'
+            )
+            chars = int(w / 7)
+            if chars > 3:
+                text = name if len(name) <= chars else name[:chars - 2] + ".."
+                out.append(f'<text x="{x + 2:.1f}" y="{y + row_height - 4}">{escape(text)}</text>')
+            out.append("</g>")
+        out.append("</svg>")
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(out))
+
+def add_profile_args(parser):
+    """Add the sampling profiler options to an argument parser"""
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", nargs="?", const="kiddo_profile", metavar="PREFIX",
+                       help="sample all threads and write PREFIX.folded, PREFIX.svg and PREFIX.txt")
+    group.add_argument("--profile-duration", type=float, metavar="SECONDS",
+                       help="only profile the first SECONDS of the session")
+    group.add_argument("--profile-interval", type=float, default=PROFILE_INTERVAL_MS, metavar="MS",
+                       help=f"sampling interval in milliseconds (default: {PROFILE_INTERVAL_MS})")
+    group.add_argument("--profile-alloc", action="store_true",
+                       help="also track allocations with tracemalloc (slower)")
+
+def start_profiler(args):
+    """Start the sampling profiler if --profile was given"""
+    if not args.profile:
+        return None
+    return SamplingProfiler(
+        output_prefix=args.profile,
+        interval_ms=args.profile_interval,
+        duration=args.profile_duration,
+        track_allocations=args.profile_alloc,
+    ).start()
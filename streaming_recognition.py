@@ -0,0 +1,276 @@
+"""
+Streaming Recognition Module
+Recognizes partial audio while the user is still talking and starts safe
+work (Wikipedia prefetch, OpenAI connection warm-up) on stable hypotheses
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from config import LLM_WARMUP_INTERVAL, VAD_TRIM_PAD_MS, WIKI_COMMANDS
+from audio_frontend import AudioFrontEnd, NUMPY_AVAILABLE, _bench_source, np
+from llm_scheduler import LLMScheduler
+from utils import log_error
+
+class SpeculativeRouter:
+    def __init__(self, assistant, recognize=None):
+        """Initialize the router for an assistant (recognize(pcm, rate, width) -> text)"""
+        self.assistant = assistant
+        self.recognize = recognize or self.recognize_google
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="Speculation")
+        self._lock = threading.Lock()
+
+        # Per-utterance state, cleared by reset()
+        self._generation = 0
+        self._recognizing = False
+        self._pending = None  # newest audio that arrived while recognizing
+        self._last_partial = None
+        self._stable = None
+        self._prefetch = {}  # command -> Future of the Wikipedia answer
+
+        self._last_warmup = 0.0
+        self.stats = {"partials": 0, "stable": 0, "prefetch_hits": 0, "prefetch_misses": 0, "warmups": 0}
+
+    def recognize_google(self, frame_data, sample_rate, sample_width):
+        """Default partial recognizer: the assistant's Google recognizer"""
+        import speech_recognition as sr
+        audio = sr.AudioData(frame_data, sample_rate, sample_width)
+        return self.assistant.recognizer.recognize_google(audio)
+
+    def reset(self):
+        """Forget the current utterance and cancel prefetches nobody used"""
+        with self._lock:
+            self._generation += 1
+            self._pending = None
+            self._last_partial = None
+            self._stable = None
+            stale, self._prefetch = self._prefetch, {}
+        for future in stale.values():
+            if future.cancel() or future.done():
+                self.stats["prefetch_misses"] += 1
+
+    def feed_audio(self, frame_data, sample_rate, sample_width, paused=False):
+        """Queue the utterance-so-far for recognition.
+
+        Only one partial is recognized at a time; audio arriving meanwhile
+        replaces any older waiting audio, since it covers at least as much.
+        """
+        job = (self._generation, frame_data, sample_rate, sample_width, paused)
+        with self._lock:
+            if self._recognizing:
+                self._pending = job
+                return
+            self._recognizing = True
+        self._executor.submit(self._recognize_partial, *job)
+
+    def _recognize_partial(self, generation, frame_data, sample_rate, sample_width, paused):
+        """Recognize partials until no newer audio is waiting"""
+        while True:
+            try:
+                text = self.recognize(frame_data, sample_rate, sample_width)
+            except Exception:
+                # Partials often fail mid-word; only the final result matters
+                text = None
+            if text:
+                self.on_partial_text(text, generation, paused)
+
+            with self._lock:
+                if self._pending is None:
+                    self._recognizing = False
+                    return
+                generation, frame_data, sample_rate, sample_width, paused = self._pending
+                self._pending = None
+
+    def on_partial_text(self, text, generation=None, paused=False):
+        """Record a partial hypothesis; act once it is stable.
+
+        A hypothesis is stable when it was taken during a pause or when the
+        same text is seen twice in a row.
+        """
+        text = text.lower().strip()
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self.stats["partials"] += 1
+            stable = paused or text == self._last_partial
+            self._last_partial = text
+            if not stable or text == self._stable:
+                return
+            self._stable = text
+            self.stats["stable"] += 1
+        self.speculate(text)
+
+    def speculate(self, text):
+        """Start the work that is safe to begin before the final transcript"""
+        intent = self.assistant.match_intent(text)
+        if intent == "wikipedia":
+            with self._lock:
+                if text not in self._prefetch:
+                    self._prefetch[text] = self._executor.submit(self.assistant.search_wikipedia, text)
+        elif intent == "openai":
+            self.warm_up_llm()
+
+    def warm_up_llm(self):
+        """Open a connection to the OpenAI API so the real request skips the handshake.
+
+        Goes through the scheduler, so it warms the client that sends the
+        completions and counts against the request budget.
+        """
+        now = time.monotonic()
+        if now - self._last_warmup < LLM_WARMUP_INTERVAL:
+            return
+        self._last_warmup = now
+        self.stats["warmups"] += 1
+
+        def warm():
+            try:
+                self.assistant.llm_scheduler.warm_up("gpt-4o")
+            except Exception as e:
+                log_error(e, "warm_up_llm")
+
+        self._executor.submit(warm)
+
+    def take_wikipedia(self, command):
+        """Return the prefetched answer for exactly this command, or None"""
+        with self._lock:
+            future = self._prefetch.pop(command, None)
+        if future is None:
+            return None
+        try:
+            result = future.result()
+        except Exception:
+            return None
+        self.stats["prefetch_hits"] += 1
+        return result
+
+# Fixture utterances: (text, word end times in seconds)
+FIXTURES = [
+    ("tell me about dinosaurs", [0.3, 0.5, 0.8, 1.5]),
+    ("who is albert einstein", [0.3, 0.5, 1.0, 1.7]),
+    ("what is photosynthesis", [0.3, 0.5, 1.6]),
+    ("tell me about the moon and the stars", [0.3, 0.5, 0.8, 1.0, 1.4, 2.0, 2.2, 2.6]),
+    ("why is the sky blue", [0.3, 0.5, 0.7, 0.9, 1.3]),
+    ("can you help me with my homework", [0.3, 0.5, 0.8, 1.0, 1.2, 1.4, 2.0]),
+]
+
+class _SimClient:
+    def __init__(self, connect_latency, llm_latency, speed):
+        """OpenAI stand-in that pays a handshake unless a warm-up already opened the connection"""
+        self.connect_latency = connect_latency
+        self.llm_latency = llm_latency
+        self.speed = speed
+        self.connected = threading.Event()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.models = SimpleNamespace(retrieve=self.retrieve)
+
+    def retrieve(self, model):
+        time.sleep(self.connect_latency / self.speed)
+        self.connected.set()
+        return SimpleNamespace(id=model)
+
+    def create(self, **request):
+        if not self.connected.is_set():
+            time.sleep(self.connect_latency / self.speed)
+            self.connected.set()
+        time.sleep(self.llm_latency / self.speed)
+        return SimpleNamespace(choices=[], usage=None)
+
+class _SimAssistant:
+    def __init__(self, scheduler, wikipedia_latency, speed):
+        """Just enough of VoiceAssistant for the router: routing, Wikipedia and the scheduler"""
+        self.llm_scheduler = scheduler
+        self.wikipedia_latency = wikipedia_latency
+        self.speed = speed
+
+    def match_intent(self, text):
+        return "wikipedia" if any(phrase in text for phrase in WIKI_COMMANDS) else "openai"
+
+    def search_wikipedia(self, query):
+        time.sleep(self.wikipedia_latency / self.speed)
+        return f"Summary of {query}"
+
+def _fixture_audio(word_ends, rate, lead_in=0.5, word_length=0.25, word_gap=0.06, tail=1.5):
+    """PCM with a tone burst for each word, ending at lead_in + word end times"""
+    rng = np.random.default_rng(0)
+    total = int(rate * (lead_in + word_ends[-1] + tail))
+    signal = rng.normal(0, 40, total)
+    previous = word_ends[0] - word_length - word_gap
+    for end in word_ends:
+        # Words run on with short gaps, like connected speech
+        start = previous + word_gap
+        a, b = int(rate * (lead_in + start)), int(rate * (lead_in + end))
+        signal[a:b] += 3000 * np.sin(2 * np.pi * 200 * np.arange(b - a) / rate)
+        previous = end
+    return np.clip(signal, -32768, 32767).astype(np.int16).tobytes()
+
+def _run_fixture(text, word_ends, rate, speculate, speed, recognize_latency,
+                 wikipedia_latency, connect_latency, llm_latency, lead_in=0.5):
+    """Capture one fixture utterance in scaled real time and return seconds from end of speech to answer"""
+    words = text.split()
+    client = _SimClient(connect_latency, llm_latency, speed)
+    assistant = _SimAssistant(LLMScheduler(client), wikipedia_latency, speed)
+
+    def recognize(frame_data, sample_rate, sample_width):
+        # Partials arrive trimmed to the voiced audio, so their length tells how far they reach
+        time.sleep(recognize_latency / speed)
+        heard = word_ends[0] - 0.25 - VAD_TRIM_PAD_MS / 1000 + len(frame_data) / sample_width / sample_rate
+        return " ".join(w for w, end in zip(words, word_ends) if end <= heard + 0.05)
+
+    router = SpeculativeRouter(assistant, recognize=recognize)
+    assistant.speculation = router
+    pcm = _fixture_audio(word_ends, rate, lead_in)
+    source = _bench_source(pcm, rate, 512)
+    stream_read = source.stream.read
+    started = time.monotonic()
+
+    def paced_read(frames):
+        # Deliver audio no faster than it would be spoken (scaled by speed)
+        due = started + (source.stream.pos / 2 + frames) / rate / speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return stream_read(frames)
+
+    source.stream.read = paced_read
+    AudioFrontEnd().capture(source, 300, on_partial=router.feed_audio if speculate else None)
+    speech_end = started + (lead_in + word_ends[-1]) / speed
+
+    # Final recognition, then the handler the real assistant would run
+    time.sleep(recognize_latency / speed)
+    if assistant.match_intent(text) == "wikipedia":
+        if router.take_wikipedia(text) is None:
+            assistant.search_wikipedia(text)
+    else:
+        assistant.llm_scheduler.create(model="gpt-4o", messages=[{"role": "user", "content": text}])
+    return (time.monotonic() - speech_end) * speed
+
+def simulate(fixtures=FIXTURES, recognize_latency=0.45, wikipedia_latency=0.9,
+             connect_latency=0.3, llm_latency=1.2, speed=4.0, rate=16000):
+    """Measure end-to-end latency with and without speculation on fixture utterances.
+
+    Each fixture is played through AudioFrontEnd.capture() and the real
+    SpeculativeRouter, with stub backends that sleep for the given latencies.
+    Time runs speed times faster than real; results are reported at 1x.
+    """
+    if not NUMPY_AVAILABLE:
+        print("NumPy is not installed")
+        return []
+
+    latencies = dict(speed=speed, recognize_latency=recognize_latency, wikipedia_latency=wikipedia_latency,
+                     connect_latency=connect_latency, llm_latency=llm_latency)
+    rows = []
+    for text, word_ends in fixtures:
+        baseline = _run_fixture(text, word_ends, rate, False, **latencies)
+        speculative = _run_fixture(text, word_ends, rate, True, **latencies)
+        rows.append((text, baseline, speculative))
+
+    print(f"{'utterance':40} {'baseline':>9} {'stream':>9} {'saved':>7}")
+    for text, baseline, speculative in rows:
+        print(f"{text:40} {baseline * 1000:7.0f}ms {speculative * 1000:7.0f}ms {(baseline - speculative) * 1000:5.0f}ms")
+    saved = sum(b - s for _, b, s in rows) / len(rows)
+    print(f"mean latency saved after end of speech: {saved * 1000:.0f}ms")
+    return rows
+
+if __name__ == "__main__":
+    simulate()
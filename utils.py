@@ -4,9 +4,11 @@ Contains helper functions for the voice assistant
 """
 
 import datetime
+import importlib.util
 import os
 import json
 from config import HISTORY_FILE, MAX_HISTORY_ENTRIES
+from error_log import get_error_log
 
 def get_time_based_greeting():
     """Get appropriate greeting based on current time"""
@@ -51,6 +53,7 @@ def save_conversation(message):
             
     except Exception as e:
         print(f"Error saving conversation: {e}")
+        log_error(e, "save_conversation")
 
 def load_conversation_history():
     """Load conversation history from file"""
@@ -63,6 +66,7 @@ def load_conversation_history():
         return []
     except Exception as e:
         print(f"Error loading conversation history: {e}")
+        log_error(e, "load_conversation_history")
         return []
 
 def clear_conversation_history():
@@ -73,6 +77,7 @@ def clear_conversation_history():
         return True
     except Exception as e:
         print(f"Error clearing conversation history: {e}")
+        log_error(e, "clear_conversation_history")
         return False
 
 def format_response_for_speech(text):
@@ -120,35 +125,26 @@ def validate_environment():
         "tkinter"
     ]
     
+    # Presence check only; importing these is slow and has side effects
     for module in required_modules:
-        try:
-            __import__(module)
-        except ImportError:
+        if importlib.util.find_spec(module) is None:
             issues.append(f"Required module '{module}' not installed")
     
     return issues
 
-def log_error(error_message, context=""):
-    """Log error messages to file"""
+def log_error(error_message, context="", **fields):
+    """Queue an error for the background log writer (never blocks on disk)"""
     try:
-        timestamp = get_current_timestamp()
-        log_entry = f"[{timestamp}] ERROR in {context}: {error_message}\n"
-        
-        with open("kiddo_errors.log", "a", encoding="utf-8") as f:
-            f.write(log_entry)
+        get_error_log().log(error_message, context=context, **fields)
     except Exception as e:
         print(f"Failed to log error: {e}")
 
 def cleanup_temp_files():
-    """Clean up temporary files created by the application"""
-    temp_files = ["kiddo_errors.log"]
-    
-    for temp_file in temp_files:
-        try:
-            if os.path.exists(temp_file) and os.path.getsize(temp_file) > 1024 * 1024:  # > 1MB
-                os.remove(temp_file)
-        except Exception as e:
-            print(f"Error cleaning up {temp_file}: {e}")
+    """Flush pending log records before the application exits"""
+    try:
+        get_error_log().flush()
+    except Exception as e:
+        print(f"Error flushing error log: {e}")
 
 def get_system_info():
     """Get basic system information for debugging"""
@@ -11,28 +11,56 @@ import webbrowser
 import pyjokes
 import os
 import json
-from openai import OpenAI
 import threading
 import time
-from utils import save_conversation, get_time_based_greeting
+import queue
+from collections import deque
+from config import BARGE_IN_ENABLED, STREAMING_PARTIALS
+from utils import save_conversation, get_time_based_greeting, log_error
+from audio_frontend import AudioFrontEnd, ListenTimeout, NUMPY_AVAILABLE
+from llm_scheduler import get_llm_scheduler, PRIORITY_INTERACTIVE
+from streaming_recognition import SpeculativeRouter
+from intent_classifier import IntentClassifier, NUMPY_AVAILABLE as CLASSIFIER_AVAILABLE
 
 class VoiceAssistant:
-    def __init__(self):
+    def __init__(self, enable_audio=True):
         """Initialize the voice assistant with all required components"""
         # Initialize speech recognition
         self.recognizer = sr.Recognizer()
         self.microphone = None
         self.microphone_available = False
         
+        # Vectorized capture path (falls back to recognizer.listen without NumPy)
+        self.audio_frontend = AudioFrontEnd() if NUMPY_AVAILABLE else None
+        
         # Initialize text-to-speech
         self.tts_engine = None
         self.tts_available = False
-        self.setup_audio_components()
+        
+        # Speech playback runs on its own thread so the mic can keep listening
+        self.speech_queue = queue.Queue()
+        self.speaking = threading.Event()
+        self.pending_speech = 0  # queued or playing utterances; speaking is set while > 0
+        self.speech_lock = threading.Lock()
+        self.tts_thread = None
+        self.barge_in_onset = None
+        self.barge_in_latencies = deque(maxlen=50)  # seconds from user onset to silence
+        if enable_audio:
+            self.setup_audio_components()
         
         # Initialize OpenAI client
         # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
         # do not change this unless explicitly requested by the user
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", "your-api-key-here"))
+        # All completions go through one process-wide scheduler, so sessions share
+        # rate limits and identical questions are sent once; its client is the only one
+        self.llm_scheduler = get_llm_scheduler()
+        self.openai_client = self.llm_scheduler.client
+        
+        # Local classifier for paraphrases the keyword checks miss
+        self.intent_classifier = IntentClassifier() if CLASSIFIER_AVAILABLE else None
+        
+        # Partial recognition and speculative prefetch while the user is talking
+        self.speculation = SpeculativeRouter(self)
         
         # Assistant state
         self.is_listening = False
@@ -84,19 +112,74 @@ class VoiceAssistant:
             self.tts_engine.setProperty('volume', 0.9)
         except Exception as e:
             print(f"TTS setup error: {e}")
+            log_error(e, "setup_tts")
     
     def speak(self, text):
-        """Convert text to speech"""
+        """Convert text to speech (queued; returns without waiting for playback)"""
         try:
             self.last_response = text
             print(f"KiddoBot: {text}")
             
             # Only use TTS if available
             if self.tts_available and self.tts_engine:
+                self.start_tts_thread()
+                with self.speech_lock:
+                    self.pending_speech += 1
+                    self.speaking.set()
+                self.speech_queue.put(text)
+        except Exception as e:
+            print(f"Speech error: {e}")
+            log_error(e, "speak")
+    
+    def start_tts_thread(self):
+        """Start the playback thread if it is not running"""
+        if self.tts_thread and self.tts_thread.is_alive():
+            return
+        self.tts_thread = threading.Thread(target=self.tts_loop, name="TTSPlayback", daemon=True)
+        self.tts_thread.start()
+    
+    def tts_loop(self):
+        """Play queued utterances one at a time"""
+        while True:
+            text = self.speech_queue.get()
+            try:
                 self.tts_engine.say(text)
                 self.tts_engine.runAndWait()
+            except Exception as e:
+                print(f"Speech error: {e}")
+                log_error(e, "speak")
+            finally:
+                if self.barge_in_onset is not None:
+                    latency = time.monotonic() - self.barge_in_onset
+                    self.barge_in_onset = None
+                    self.barge_in_latencies.append(latency)
+                    print(f"Barge-in: stopped speaking {latency * 1000:.0f} ms after you started talking")
+                self.finish_speech(1)
+    
+    def finish_speech(self, count):
+        """Mark count utterances as played or dropped; clear speaking when none are left"""
+        with self.speech_lock:
+            self.pending_speech = max(0, self.pending_speech - count)
+            if not self.pending_speech:
+                self.speaking.clear()
+    
+    def interrupt_speech(self, onset_time=None):
+        """Stop playback and drop queued utterances (called when the user barges in)"""
+        if not self.speaking.is_set():
+            return
+        self.barge_in_onset = onset_time if onset_time is not None else time.monotonic()
+        dropped = 0
+        try:
+            while True:
+                self.speech_queue.get_nowait()
+                dropped += 1
+        except queue.Empty:
+            pass
+        self.finish_speech(dropped)
+        try:
+            self.tts_engine.stop()
         except Exception as e:
-            print(f"Speech error: {e}")
+            log_error(e, "interrupt_speech")
     
     def listen(self, timeout=5):
         """Listen for voice input and convert to text"""
@@ -104,10 +187,15 @@ class VoiceAssistant:
             return "no_microphone"
             
         try:
+            # Drop speculative work left over from the previous utterance
+            self.speculation.reset()
+            if not self.barge_in_active():
+                # Without echo handling the mic would hear our own reply as the next command
+                while self.speaking.is_set():
+                    time.sleep(0.05)
             with self.microphone as source:
                 print("Listening...")
-                # Listen for audio with timeout
-                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=10)
+                audio = self.capture_audio(source, timeout)
                 
             print("Processing speech...")
             # Convert speech to text
@@ -115,17 +203,39 @@ class VoiceAssistant:
             print(f"You said: {text}")
             return text.lower()
             
-        except sr.WaitTimeoutError:
+        except (sr.WaitTimeoutError, ListenTimeout):
             return "timeout"
         except sr.UnknownValueError:
             return "unknown"
         except sr.RequestError as e:
             print(f"Speech recognition error: {e}")
+            log_error(e, "recognize_google")
             return "error"
         except Exception as e:
             print(f"Listen error: {e}")
+            log_error(e, "listen")
             return "error"
     
+    def barge_in_active(self):
+        """Whether capture can tell the user apart from our own playback"""
+        return (BARGE_IN_ENABLED and self.tts_available and self.audio_frontend is not None
+                and getattr(self.microphone, "SAMPLE_WIDTH", None) == 2)
+    
+    def capture_audio(self, source, timeout):
+        """Record one utterance from an open microphone source"""
+        if self.audio_frontend and getattr(source, "SAMPLE_WIDTH", None) == 2:
+            barge_in = self.barge_in_active()
+            frame_data, sample_rate, sample_width = self.audio_frontend.capture(
+                source, self.recognizer.energy_threshold, timeout=timeout, phrase_time_limit=10,
+                playback_active=self.speaking.is_set if barge_in else None,
+                on_barge_in=self.interrupt_speech if barge_in else None,
+                on_partial=self.speculation.feed_audio if STREAMING_PARTIALS else None,
+            )
+            return sr.AudioData(frame_data, sample_rate, sample_width)
+        
+        # Listen for audio with timeout
+        return self.recognizer.listen(source, timeout=timeout, phrase_time_limit=10)
+    
     def get_current_time(self):
         """Get current time and date"""
         now = datetime.datetime.now()
@@ -155,6 +265,7 @@ class VoiceAssistant:
         except wikipedia.exceptions.PageError:
             return f"Sorry, I couldn't find any information about {query} on Wikipedia."
         except Exception as e:
+            log_error(e, "search_wikipedia")
             return f"Sorry, I encountered an error while searching: {str(e)}"
     
     def tell_joke(self):
@@ -187,10 +298,11 @@ class VoiceAssistant:
         except Exception as e:
             return f"Sorry, I couldn't open that website: {str(e)}"
     
-    def ask_openai(self, question):
+    def ask_openai(self, question, priority=PRIORITY_INTERACTIVE):
         """Get response from OpenAI GPT"""
         try:
-            response = self.openai_client.chat.completions.create(
+            response = self.llm_scheduler.create(
+                priority=priority,
                 model="gpt-4o",  # the newest OpenAI model is "gpt-4o"
                 messages=[
                     {"role": "system", "content": "You are KiddoBot, a friendly and helpful voice assistant. Keep responses concise but informative, suitable for voice output."},
@@ -204,56 +316,68 @@ class VoiceAssistant:
             else:
                 return "I received an empty response. Please try asking something else."
         except Exception as e:
+            log_error(e, "ask_openai")
             return f"Sorry, I couldn't process your question right now. Error: {str(e)}"
     
-    def process_command(self, command):
-        """Process voice command and return appropriate response"""
+    def match_intent(self, command):
+        """Return the built-in intent for a command ("openai" if none matches)"""
         command = command.lower().strip()
         
-        # Save the conversation
-        save_conversation(f"User: {command}")
-        
         # Exit commands
         if any(word in command for word in ["stop", "quit", "bye", "goodbye", "exit"]):
-            response = "Goodbye! It was nice talking to you!"
-            save_conversation(f"KiddoBot: {response}")
-            return response, "exit"
-        
+            return "exit"
         # Greeting
         if any(word in command for word in ["hello", "hi", "hey"]):
-            greeting = get_time_based_greeting()
-            response = f"Hi! I'm KiddoBot, your smart buddy! {greeting}"
-            save_conversation(f"KiddoBot: {response}")
-            return response, "continue"
-        
+            return "greeting"
         # Time and date
         if any(word in command for word in ["time", "date", "today"]):
-            response = self.get_current_time()
-            save_conversation(f"KiddoBot: {response}")
-            return response, "continue"
-        
+            return "time"
         # Wikipedia search
         if any(phrase in command for phrase in ["tell me about", "search for", "what is", "who is", "wikipedia"]):
-            response = self.search_wikipedia(command)
-            save_conversation(f"KiddoBot: {response}")
-            return response, "continue"
-        
+            return "wikipedia"
         # Jokes
         if any(word in command for word in ["joke", "funny", "laugh"]):
-            response = self.tell_joke()
-            save_conversation(f"KiddoBot: {response}")
-            return response, "continue"
-        
+            return "joke"
         # Website opening
         if any(word in command for word in ["open", "youtube", "google"]) or "http" in command:
+            return "website"
+        # Paraphrases of built-in commands ("make me giggle") stay local
+        if self.intent_classifier:
+            intent, _ = self.intent_classifier.classify(command)
+            if intent:
+                return intent
+        # Default: Ask OpenAI
+        return "openai"
+    
+    def process_command(self, command, priority=PRIORITY_INTERACTIVE):
+        """Process voice command and return appropriate response"""
+        command = command.lower().strip()
+        
+        # Save the conversation
+        save_conversation(f"User: {command}")
+        
+        intent = self.match_intent(command)
+        action = "continue"
+        if intent == "exit":
+            response = "Goodbye! It was nice talking to you!"
+            action = "exit"
+        elif intent == "greeting":
+            greeting = get_time_based_greeting()
+            response = f"Hi! I'm KiddoBot, your smart buddy! {greeting}"
+        elif intent == "time":
+            response = self.get_current_time()
+        elif intent == "wikipedia":
+            # Use the result fetched while the user was still talking, if it matches
+            response = self.speculation.take_wikipedia(command) or self.search_wikipedia(command)
+        elif intent == "joke":
+            response = self.tell_joke()
+        elif intent == "website":
             response = self.open_website(command)
-            save_conversation(f"KiddoBot: {response}")
-            return response, "continue"
+        else:
+            response = self.ask_openai(command, priority=priority)
         
-        # Default: Ask OpenAI
-        response = self.ask_openai(command)
         save_conversation(f"KiddoBot: {response}")
-        return response, "continue"
+        return response, action
     
     def start_listening_loop(self, callback=None):
         """Start continuous listening in a separate thread"""
@@ -306,6 +430,7 @@ class VoiceAssistant:
                         
                 except Exception as e:
                     error_msg = f"An error occurred: {str(e)}"
+                    log_error(e, "listen_loop")
                     if callback:
                         callback(error_msg, "System")
                     else: